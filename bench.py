@@ -0,0 +1,215 @@
+"""
+Benchmarks of the hot paths of the game: generating a grid, counting the
+mines, opening connected zeros, opening all fields and checking for a win.
+Every path is timed on board sizes from 10x10 to 2000x2000 and mine densities
+from 1% to 22%. The user interface is replaced by a stub that draws nothing,
+so no display is needed.
+
+The results can be saved as JSON and compared with the results of an earlier
+run. A path that has become slower than the tolerance allows is reported as
+a regression, and the exit status is then 1.
+
+Usage: python bench.py [--quick] [--repeat N] [--output FILE]
+                       [--baseline FILE] [--tolerance FRACTION]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from board import MINE, CLOSED
+from gamegrid import GameGrid
+
+SIZES = [(10, 10), (100, 100), (500, 500), (1000, 1000), (2000, 2000)]
+QUICK_SIZES = [(10, 10), (100, 100), (500, 500)]
+DENSITIES = [1, 5, 10, 15, 22]
+
+#  The timed paths, in the order they are run.
+PATHS = ["generate_fields", "calculate_mines", "open_connected_zeros",
+         "open_all_fields", "check_if_win"]
+
+DEFAULT_REPEAT = 3
+#  How much slower than the baseline a path may be before it is reported.
+DEFAULT_TOLERANCE = 0.25
+#  Times shorter than this are too noisy to be compared with the baseline.
+MIN_COMPARED_TIME = 0.001
+
+SEED = 0
+
+
+class StubUI:
+    """
+    Stands in for the user interface. Nothing is drawn, but a game over opens
+    all fields like the real user interface does.
+    """
+    def draw_fields(self, indices):
+        """
+        :param indices: list, the indices of the changed fields
+        """
+
+    def game_over(self, win, grid_object):
+        """
+        :param win: bool, True if won, False if lost
+        :param grid_object: GameGrid, the grid that the fields are stored in
+        """
+        grid_object.open_all_fields()
+
+
+def timed(function, *args):
+    """
+    :param function: the function to time
+    :return: float, the time in seconds that calling the function took
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def open_all_zeros(grid_object):
+    """
+    Opens every region of connected zeros on the grid, one click each.
+
+    :param grid_object: GameGrid, the grid to open the zeros of
+    """
+    board = grid_object.get_board()
+    values = board.get_values()
+    state = board.get_state()
+    index = values.find(0)
+    while index != -1:
+        if state[index] == CLOSED:
+            board.open_connected_zeros(index)
+        index = values.find(0, index + 1)
+
+
+def flag_all_mines(grid_object):
+    """
+    Flags every mine of the grid, so that checking for a win succeeds.
+
+    :param grid_object: GameGrid, the grid to flag the mines of
+    """
+    board = grid_object.get_board()
+    values = board.get_values()
+    index = values.find(MINE)
+    while index != -1:
+        board.flag(index)
+        index = values.find(MINE, index + 1)
+
+
+def run_case(height, width, density):
+    """
+    Times every path once on a board of the given size and density. Each
+    path is timed on a newly generated board.
+
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :param density: int, the percentage of fields that have a mine
+    :return: dict, the time in seconds by the name of the path
+    """
+    grid_object = GameGrid()
+    ui = StubUI()
+
+    def generate():
+        grid_object.generate_fields(height, width, density, ui, SEED)
+
+    times = {"generate_fields": timed(generate)}
+    times["calculate_mines"] = timed(grid_object.get_board().calculate_mines)
+
+    generate()
+    times["open_connected_zeros"] = timed(open_all_zeros, grid_object)
+
+    generate()
+    times["open_all_fields"] = timed(grid_object.open_all_fields)
+
+    #  The check is timed on a won game. Only the check itself is timed,
+    #  not ending the game that follows it.
+    generate()
+    flag_all_mines(grid_object)
+    times["check_if_win"] = timed(grid_object.check_if_win)
+    return times
+
+
+def run(sizes, repeat):
+    """
+    Runs every case and keeps the best time of each path.
+
+    :param sizes: list, the (height, width) of the boards
+    :param repeat: int, how many times each case is run
+    :return: dict, the best time in seconds by "path/HEIGHTxWIDTH/DENSITY%"
+    """
+    results = {}
+    for height, width in sizes:
+        for density in DENSITIES:
+            case = f"{height}x{width}/{density}%"
+            for _ in range(repeat):
+                for path, seconds in run_case(height, width,
+                                              density).items():
+                    key = f"{path}/{case}"
+                    results[key] = min(results.get(key, seconds), seconds)
+            print(case + " " + ", ".join(
+                f"{path} {results[f'{path}/{case}']:.4f} s"
+                for path in PATHS), flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints how much the times have changed from the baseline.
+
+    :param results: dict, the times of this run, see run()
+    :param baseline: dict, the times of an earlier run
+    :param tolerance: float, how much slower a path may be, as a fraction
+    :return: list, the keys of the paths that have become too slow
+    """
+    regressions = []
+    for key, seconds in results.items():
+        before = baseline.get(key)
+        if before is None or max(before, seconds) < MIN_COMPARED_TIME:
+            continue
+        change = seconds / before - 1
+        if change > tolerance:
+            regressions.append(key)
+            print(f"REGRESSION {key}: {before:.4f} s -> {seconds:.4f} s "
+                  f"({change:+.0%})")
+        elif change < -tolerance:
+            print(f"improved {key}: {before:.4f} s -> {seconds:.4f} s "
+                  f"({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Times the hot paths of the game.")
+    parser.add_argument("--quick", action="store_true",
+                        help="only run the boards up to 500x500")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="how many times each case is run, the best "
+                             "time is kept")
+    parser.add_argument("--output", help="file that the results are saved "
+                                         "to as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to "
+                                           "compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="how much slower than the baseline a path may "
+                             "be, as a fraction")
+    args = parser.parse_args()
+
+    results = run(QUICK_SIZES if args.quick else SIZES, args.repeat)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "results": results}, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline)["results"],
+                                  args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
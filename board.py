@@ -0,0 +1,648 @@
+import random
+
+from topology import SQUARE, FULL_DEGREE, get_neighbor_table, \
+    get_neighbor_counter, find_neighbors
+
+#  The value of a field that has a mine. Other fields store the number of
+#  mines surrounding them (0-8).
+MINE = 9
+
+#  The possible states of a field.
+CLOSED = 0
+OPENED = 1
+FLAGGED = 2
+
+OPENED_ROW = bytes([OPENED])
+
+#  Translation table mapping zeros to 0 and all other values to 1.
+NONZERO_TABLE = bytes([0] + [1] * 255)
+#  Translation table mapping mines to 1 and all other values to 0.
+MINE_TABLE = bytes(1 if value == MINE else 0 for value in range(256))
+
+
+class Board:
+    """
+    The headless state of a game. The mine layout, the number of surrounding
+    mines and the open/flag state of every field are stored in flat
+    bytearrays, where the field at (row, col) is found at the index
+    row * width + col. A board doesn't depend on tkinter, so it can be created
+    and played without a user interface.
+
+    The board also keeps count of the correctly and wrongly flagged fields and
+    the safe fields that are still closed as the fields are opened and
+    flagged, so whether the game is won or lost can be asked at any time
+    without going through the fields.
+
+    Which fields surround each other is given by the topology of the board.
+    The surrounding fields are looked up from a neighbor table shared by all
+    boards of the same size, except on the ordinary square board, where the
+    mines are counted and the zeros filled a whole row at a time instead.
+
+    A field on a square board takes three bytes, one in each of the values,
+    the state and the nonzero fields. The neighbor table of the other
+    topologies adds about 36 bytes per field.
+    """
+    def __init__(self, height, width, topology=SQUARE):
+        """
+        :param height: int, number of rows on the board
+        :param width: int, number of columns on the board
+        :param topology: str, the shape of the board, SQUARE, TORUS or HEX
+        """
+        self.__height = height
+        self.__width = width
+        self.__topology = topology
+        #  The neighbor table is only built once it is needed.
+        self.__neighbor_table = None
+
+        #  self.__values holds the number of mines surrounding each field,
+        #  with the exception of 9 (MINE) meaning that the field is a mine.
+        self.__values = bytearray(height * width)
+        self.__state = bytearray(height * width)
+
+        #  self.__nonzero has a 1 for every field that isn't a zero. It lets
+        #  the flood fill find the ends of a row of zeros with bytes.find().
+        self.__nonzero = bytes(height * width)
+
+        self.__seed = None
+        self.__random = None
+
+        self.__number_of_mines = 0
+        self.__correct_flags = 0
+        self.__wrong_flags = 0
+        self.__closed_safe_fields = 0
+        self.__exploded = False
+
+    def generate(self, difficulty, seed=None):
+        """
+        Places the mines on the board and calculates the number of mines
+        surrounding each field. Any previous game on the board is cleared,
+        so a board can be reused. The number of mines is exactly the given
+        percentage of the fields, and they are placed with a random number
+        generator of their own, so the same seed always gives the same board.
+
+        :param difficulty: int, the percentage of fields that have a mine
+        :param seed: int, the seed of the board, or None for a random one
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.__seed = seed
+        self.__random = random.Random(seed)
+
+        values = self.__values
+        size = len(values)
+        number_of_mines = min(round(size * difficulty / 100), size)
+
+        values[:] = bytes(size)
+        self.__state[:] = bytes(size)
+        for index in self.__random.sample(range(size), number_of_mines):
+            values[index] = MINE
+        self.calculate_mines()
+
+    def move_mines_away(self, index):
+        """
+        Moves the mines in and around the field to random fields elsewhere on
+        the board, so that the field opens as a zero. This is used to make the
+        first opened field of a game safe without generating a new board.
+
+        :param index: int, index of the field
+        """
+        values = self.__values
+        area = self.get_neighbors(index) + [index]
+        moved = [field for field in area if values[field] == MINE]
+        if not moved:
+            return
+
+        #  The mines can only be moved to fields that aren't mines already and
+        #  aren't around the opened field. If the board is too full, as many
+        #  mines as possible are moved.
+        free = len(values) - values.count(MINE) - (len(area) - len(moved))
+        area = set(area)
+        for field in moved[:max(free, 0)]:
+            target = self.__random.randrange(len(values))
+            while values[target] == MINE or target in area:
+                target = self.__random.randrange(len(values))
+            values[target] = MINE
+            values[field] = 0
+        self.calculate_mines()
+
+    def restore(self, mines, state, seed=None):
+        """
+        Restores a saved game on the board. The numbers of surrounding mines
+        and the counts of the fields are calculated again from the mines.
+
+        :param mines: bytes, MINE for every field that has a mine and 0 for
+        the others
+        :param state: bytes, the state of every field
+        :param seed: int, the seed the board was generated with
+        """
+        self.__seed = seed
+        self.__random = random.Random(seed)
+        self.__values[:] = mines
+        self.__state[:] = state
+        self.calculate_mines()
+
+    def set_fields(self, indices, states):
+        """
+        Sets the state of the given fields, e.g. to undo or redo moves. The
+        counts of the fields are kept up to date.
+
+        :param indices: iterable, the indices of the fields
+        :param states: iterable, the new state of each field
+        """
+        state = self.__state
+        values = self.__values
+        closed_opened_mine = False
+        for index, new in zip(indices, states):
+            old = state[index]
+            if old == new:
+                continue
+            state[index] = new
+            if values[index] == MINE:
+                self.__correct_flags += (new == FLAGGED) - (old == FLAGGED)
+                if new == OPENED:
+                    self.__exploded = True
+                elif old == OPENED:
+                    closed_opened_mine = True
+            else:
+                self.__wrong_flags += (new == FLAGGED) - (old == FLAGGED)
+                self.__closed_safe_fields += (old == OPENED) - (new == OPENED)
+
+        #  Whether another opened mine is left is only known by counting.
+        if closed_opened_mine:
+            self.__count_fields(int.from_bytes(self.get_mines(), "little"))
+
+    def set_state(self, state):
+        """
+        Sets the state of every field at once and counts the fields again.
+
+        :param state: bytes, the state of every field
+        """
+        self.__state[:] = state
+        self.__count_fields(int.from_bytes(self.get_mines(), "little"))
+
+    def set_mines(self, indices, mines):
+        """
+        Places or removes mines on the given fields and counts the mines
+        surrounding every field again, e.g. to undo moving the mines away
+        from the first opened field.
+
+        :param indices: iterable, the indices of the fields
+        :param mines: iterable, True for each field that gets a mine
+        """
+        values = self.__values
+        for index, mine in zip(indices, mines):
+            values[index] = MINE if mine else 0
+        self.calculate_mines()
+
+    def get_mines(self):
+        """
+        :return: bytes, 1 for every field that has a mine and 0 for the others
+        """
+        return self.__values.translate(MINE_TABLE)
+
+    def calculate_mines(self):
+        """
+        Calculates the number of mines surrounding each field that isn't a
+        mine itself. All fields are counted in one batch: the mine layout is
+        packed into a big integer with one byte per field, and the counts are
+        sums of that integer shifted one field in every direction.
+        """
+        if self.__topology != SQUARE:
+            self.__calculate_mines_from_table()
+            return
+
+        values = self.__values
+        count_neighbors = get_neighbor_counter(self.__height, self.__width)
+        mines = int.from_bytes(values.translate(MINE_TABLE), "little")
+        counts = count_neighbors(mines)
+
+        #  A mine that is completely surrounded by mines is converted into a
+        #  non-mine field (8). Otherwise it would be impossible to tell if the
+        #  middle field is a mine or not. A count can only have its fourth bit
+        #  set if it is 8, so such mines are found with one shift.
+        surrounded = (counts >> 3) & mines
+        if surrounded:
+            mines &= ~surrounded
+            counts = count_neighbors(mines)
+
+        counts = (counts & ~(mines * 0xFF)) | (mines * MINE)
+        values[:] = counts.to_bytes(len(values), "little")
+        self.__nonzero = values.translate(NONZERO_TABLE)
+        self.__count_fields(mines)
+
+    def __calculate_mines_from_table(self):
+        """
+        Calculates the number of mines surrounding each field that isn't a
+        mine itself by adding every mine to the count of its neighbors.
+        """
+        values = self.__values
+        starts, neighbors = self.get_neighbor_table()
+        mines = []
+        index = values.find(MINE)
+        while index != -1:
+            mines.append(index)
+            index = values.find(MINE, index + 1)
+
+        counts = bytearray(len(values))
+        for index in mines:
+            for neighbor in neighbors[starts[index]:starts[index + 1]]:
+                counts[neighbor] += 1
+
+        #  A mine that is completely surrounded by mines is converted into a
+        #  non-mine field. Otherwise it would be impossible to tell if the
+        #  middle field is a mine or not.
+        full_degree = FULL_DEGREE[self.__topology]
+        surrounded = [index for index in mines if counts[index] == full_degree]
+        for index in surrounded:
+            for neighbor in neighbors[starts[index]:starts[index + 1]]:
+                counts[neighbor] -= 1
+        mines = set(mines).difference(surrounded)
+
+        for index in mines:
+            counts[index] = MINE
+        values[:] = counts
+        self.__nonzero = values.translate(NONZERO_TABLE)
+        self.__count_fields(
+            int.from_bytes(values.translate(MINE_TABLE), "little"))
+
+    def __count_fields(self, mines):
+        """
+        Counts the mines, the correctly and wrongly flagged fields and the
+        closed safe fields from scratch. The mine layout is added to the state
+        of the fields so that every combination of the two is a byte value of
+        its own and can be counted with bytes.count().
+
+        :param mines: int, the mine layout with a byte for each field, 1 if
+        the field has a mine and 0 if not
+        """
+        state = self.__state
+        fields = ((mines << 2) + int.from_bytes(state, "little")).to_bytes(
+            len(state), "little")
+        self.__number_of_mines = len(fields) - fields.count(CLOSED) \
+            - fields.count(OPENED) - fields.count(FLAGGED)
+        self.__correct_flags = fields.count(4 + FLAGGED)
+        self.__wrong_flags = fields.count(FLAGGED)
+        self.__closed_safe_fields = fields.count(CLOSED) + self.__wrong_flags
+        self.__exploded = OPENED + 4 in fields
+
+    def get_neighbors(self, index):
+        """
+        :param index: int, index of the field
+        :return: list, the indices of the fields surrounding the field
+        """
+        #  A square board doesn't otherwise need the neighbor table, which
+        #  would take far longer to build for a large board than finding the
+        #  few fields around one field.
+        if self.__neighbor_table is None:
+            return find_neighbors(*self.get_row_col(index), self.__height,
+                                  self.__width, self.__topology)
+        starts, neighbors = self.__neighbor_table
+        return neighbors[starts[index]:starts[index + 1]].tolist()
+
+    def get_neighbor_table(self):
+        """
+        :return: (array, array), the table of surrounding fields, see
+        topology.get_neighbor_table()
+        """
+        if self.__neighbor_table is None:
+            self.__neighbor_table = get_neighbor_table(
+                self.__height, self.__width, self.__topology)
+        return self.__neighbor_table
+
+    def load_area(self, row, col, height, width):
+        """
+        Called when an area comes into view. The whole board is always in
+        memory, so there is nothing to load, see ChunkedBoard.load_area().
+
+        :param row: int, the first row of the area
+        :param col: int, the first column of the area
+        :param height: int, number of rows in the area
+        :param width: int, number of columns in the area
+        :return: list, the indices of the fields that were opened, always
+        empty
+        """
+        return []
+
+    def open_field(self, index):
+        """
+        Opens the field. Opening a field also unflags it.
+
+        :param index: int, index of the field
+        :return: bool, True if the field was opened, False if it already was
+        """
+        if self.__state[index] == OPENED:
+            return False
+        self.unflag(index)
+        self.__state[index] = OPENED
+        if self.__values[index] == MINE:
+            self.__exploded = True
+        else:
+            self.__closed_safe_fields -= 1
+        return True
+
+    def open_connected_zeros(self, index):
+        """
+        Opens the field and, if it is a zero, all the zeros connected to it and
+        their surrounding fields. Flagged fields are left closed.
+
+        The zeros are filled a whole row segment at a time. The state array
+        doubles as the visited bitmap: a zero is marked as opened when its
+        segment is handled, so every field is handled at most once and the
+        time taken is linear in the size of the opened region.
+
+        :param index: int, index of the field
+        :return: list, the indices of the fields that were opened
+        """
+        if self.__topology != SQUARE:
+            return self.__open_connected_zeros_from_table(index)
+
+        state = self.__state
+        nonzero = self.__nonzero
+        width = self.__width
+        size = len(state)
+
+        revealed = []
+        if state[index] != CLOSED:
+            return revealed
+        if nonzero[index]:
+            self.open_field(index)
+            revealed.append(index)
+            return revealed
+
+        stack = [index]
+        while stack:
+            index = stack.pop()
+            if state[index] != CLOSED:
+                continue
+            row_start = index - index % width
+            row_end = row_start + width
+
+            #  Find the segment of closed zeros around the field.
+            end = nonzero.find(1, index, row_end)
+            if end == -1:
+                end = row_end
+            for blocker in (state.find(OPENED, index, end),
+                            state.find(FLAGGED, index, end)):
+                if blocker != -1 and blocker < end:
+                    end = blocker
+            start = nonzero.rfind(1, row_start, index) + 1
+            if start == 0:
+                start = row_start
+            for blocker in (state.rfind(OPENED, start, index),
+                            state.rfind(FLAGGED, start, index)):
+                if blocker >= start:
+                    start = blocker + 1
+
+            state[start:end] = OPENED_ROW * (end - start)
+            revealed.extend(range(start, end))
+
+            #  Open the fields on both sides of the segment.
+            if start > row_start and state[start - 1] == CLOSED:
+                state[start - 1] = OPENED
+                revealed.append(start - 1)
+            if end < row_end and state[end] == CLOSED:
+                state[end] = OPENED
+                revealed.append(end)
+
+            #  Open the fields above and below the segment. Closed zeros are
+            #  not opened here but pushed to the stack, so that their own
+            #  segments get handled.
+            first = start - 1 if start > row_start else start
+            last = end + 1 if end < row_end else end
+            for offset in (-width, width):
+                pos = first + offset
+                stop = last + offset
+                if pos < 0 or stop > size:
+                    continue
+                while pos < stop:
+                    if nonzero[pos]:
+                        run_end = nonzero.find(0, pos, stop)
+                        if run_end == -1:
+                            run_end = stop
+                        for field in range(pos, run_end):
+                            if state[field] == CLOSED:
+                                state[field] = OPENED
+                                revealed.append(field)
+                    else:
+                        run_end = nonzero.find(1, pos, stop)
+                        if run_end == -1:
+                            run_end = stop
+                        if state[pos] == CLOSED:
+                            field = pos
+                        else:
+                            field = state.find(CLOSED, pos, run_end)
+                        while field != -1:
+                            stack.append(field)
+                            blocked = run_end
+                            for blocker in (
+                                    state.find(OPENED, field, run_end),
+                                    state.find(FLAGGED, field, run_end)):
+                                if blocker != -1 and blocker < blocked:
+                                    blocked = blocker
+                            field = state.find(CLOSED, blocked, run_end)
+                    pos = run_end
+
+        self.__closed_safe_fields -= len(revealed)
+        return revealed
+
+    def __open_connected_zeros_from_table(self, index):
+        """
+        Opens the field and, if it is a zero, all the zeros connected to it and
+        their surrounding fields, going through the neighbor table one field
+        at a time. As in open_connected_zeros(), the state array is the
+        visited bitmap.
+
+        :param index: int, index of the field
+        :return: list, the indices of the fields that were opened
+        """
+        state = self.__state
+        values = self.__values
+        starts, neighbors = self.get_neighbor_table()
+
+        revealed = []
+        if state[index] != CLOSED:
+            return revealed
+        if values[index] != 0:
+            self.open_field(index)
+            revealed.append(index)
+            return revealed
+
+        state[index] = OPENED
+        revealed.append(index)
+        stack = [index]
+        while stack:
+            index = stack.pop()
+            for neighbor in neighbors[starts[index]:starts[index + 1]]:
+                if state[neighbor] == CLOSED:
+                    state[neighbor] = OPENED
+                    revealed.append(neighbor)
+                    if values[neighbor] == 0:
+                        stack.append(neighbor)
+
+        self.__closed_safe_fields -= len(revealed)
+        return revealed
+
+    def flag(self, index):
+        """
+        Flags the field, unless it has already been opened.
+
+        :param index: int, index of the field
+        :return: bool, True if the field was flagged, False if not
+        """
+        if self.__state[index] != CLOSED:
+            return False
+        self.__state[index] = FLAGGED
+        if self.__values[index] == MINE:
+            self.__correct_flags += 1
+        else:
+            self.__wrong_flags += 1
+        return True
+
+    def unflag(self, index):
+        """
+        Removes the flag from the field.
+
+        :param index: int, index of the field
+        :return: bool, True if the field was flagged, False if not
+        """
+        if self.__state[index] != FLAGGED:
+            return False
+        self.__state[index] = CLOSED
+        if self.__values[index] == MINE:
+            self.__correct_flags -= 1
+        else:
+            self.__wrong_flags -= 1
+        return True
+
+    def open_all(self):
+        """
+        Opens all fields on the board. This is called when a game is over.
+
+        :return: list, the indices of the fields that were opened
+        """
+        state = self.__state
+        opened = [index for index, field in enumerate(state)
+                  if field != OPENED]
+        state[:] = OPENED_ROW * len(state)
+
+        self.__correct_flags = 0
+        self.__wrong_flags = 0
+        self.__closed_safe_fields = 0
+        return opened
+
+    def get_index(self, row, col):
+        """
+        :param row: int, row index of the field
+        :param col: int, column index of the field
+        :return: int, the index of the field in the flat arrays
+        """
+        return row * self.__width + col
+
+    def get_row_col(self, index):
+        """
+        :param index: int, index of the field
+        :return: (int, int), the row and column index of the field
+        """
+        return divmod(index, self.__width)
+
+    def get_value(self, index):
+        """
+        :param index: int, index of the field
+        :return: int, number of mines surrounding the field (or 9 if mine)
+        """
+        return self.__values[index]
+
+    def is_mine(self, index):
+        """
+        :param index: int, index of the field
+        :return: bool, True if the field has a mine, False if not
+        """
+        return self.__values[index] == MINE
+
+    def is_opened(self, index):
+        """
+        :param index: int, index of the field
+        :return: bool, True if the field has been opened, False if not
+        """
+        return self.__state[index] == OPENED
+
+    def is_flagged(self, index):
+        """
+        :param index: int, index of the field
+        :return: bool, True if the field has been flagged, False if not
+        """
+        return self.__state[index] == FLAGGED
+
+    def is_won(self):
+        """
+        :return: bool, True if every mine is flagged and every flagged field
+        has a mine, False if not
+        """
+        return self.__correct_flags == self.__number_of_mines \
+            and self.__wrong_flags == 0 and not self.__exploded
+
+    def is_lost(self):
+        """
+        :return: bool, True if a mine has been opened, False if not
+        """
+        return self.__exploded
+
+    def get_number_of_mines(self):
+        """
+        :return: int, number of mines on the board
+        """
+        return self.__number_of_mines
+
+    def get_correct_flags(self):
+        """
+        :return: int, number of flagged fields that have a mine
+        """
+        return self.__correct_flags
+
+    def get_wrong_flags(self):
+        """
+        :return: int, number of flagged fields that don't have a mine
+        """
+        return self.__wrong_flags
+
+    def get_closed_safe_fields(self):
+        """
+        :return: int, number of fields without a mine that are still closed
+        """
+        return self.__closed_safe_fields
+
+    def get_values(self):
+        """
+        :return: bytearray, the values of all fields
+        """
+        return self.__values
+
+    def get_state(self):
+        """
+        :return: bytearray, the states of all fields
+        """
+        return self.__state
+
+    def get_seed(self):
+        """
+        :return: int, the seed the board was generated with
+        """
+        return self.__seed
+
+    def get_topology(self):
+        """
+        :return: str, the shape of the board, SQUARE, TORUS or HEX
+        """
+        return self.__topology
+
+    def get_height(self):
+        """
+        :return: int, number of rows on the board
+        """
+        return self.__height
+
+    def get_width(self):
+        """
+        :return: int, number of columns on the board
+        """
+        return self.__width
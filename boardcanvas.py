@@ -0,0 +1,381 @@
+from tkinter import Canvas, Frame, Scrollbar, HORIZONTAL, VERTICAL, NS, EW
+
+from board import MINE
+from profiler import get_profiler
+from topology import HEX
+
+FONT = "Arial"
+
+CLOSED_COLOR = "#F0F0F0"
+ZERO_COLOR = "white"
+MINE_COLOR = "red"
+OPENED_COLOR = "light grey"
+FLAGGED_COLOR = "orange"
+OUTLINE_COLOR = "grey"
+
+#  The size of a field in pixels.
+FIELD_SIZE = 21
+
+#  The largest number of fields shown at once. Larger boards are scrolled.
+MAX_VISIBLE_ROWS = 30
+MAX_VISIBLE_COLS = 60
+
+
+class BoardCanvas:
+    """
+    Draws the fields of a board on a single Canvas. The canvas has a tile
+    (a rectangle and a text item) for every visible field, and the tiles are
+    mapped to the fields of the board through the scroll position, so only
+    the visible part of a large board is ever drawn. Clicks on the canvas are
+    mapped back to fields by their coordinates.
+
+    Changed fields are collected and drawn in one batch once Tk is idle, and
+    only the tiles whose color or text actually changes are configured.
+
+    On a hex board the odd rows are drawn half a field to the right, so that
+    every field touches the six fields that surround it.
+    """
+    def __init__(self, master, grid_object):
+        """
+        :param master: Tk, the window that the canvas is displayed in
+        :param grid_object: GameGrid, the grid that the fields are stored in
+        """
+        self.__grid_object = grid_object
+        self.__board = None
+
+        self.__frame = Frame(master)
+        self.__canvas = Canvas(self.__frame, highlightthickness=0,
+                               borderwidth=0, background=CLOSED_COLOR)
+        self.__row_scrollbar = Scrollbar(self.__frame, orient=VERTICAL,
+                                         command=self.scroll_rows)
+        self.__col_scrollbar = Scrollbar(self.__frame, orient=HORIZONTAL,
+                                         command=self.scroll_cols)
+        self.__canvas.grid(row=0, column=0)
+
+        self.__canvas.bind("<Button-1>", self.open_on_press)
+        self.__canvas.bind("<Button-2>", self.flag)
+        self.__canvas.bind("<Button-3>", self.flag)
+
+        #  The item ids of the tiles by row and column, and the same ids in
+        #  row-major order of the visible area.
+        self.__tiles = []
+        self.__rectangles = []
+        self.__texts = []
+        #  The (color, text) currently shown on each tile.
+        self.__looks = []
+
+        #  The fields waiting to be redrawn. If self.__redraw_all is True,
+        #  the whole visible area is redrawn instead.
+        self.__dirty = []
+        self.__redraw_all = False
+        self.__redraw_pending = False
+        #  The number of calls made to the canvas and the scrollbars since
+        #  the last redraw, for the profiler.
+        self.__tk_calls = 0
+
+        self.__visible_rows = 0
+        self.__visible_cols = 0
+        self.__first_row = 0
+        self.__first_col = 0
+        #  True if the odd rows are shifted half a field to the right.
+        self.__shifted = False
+
+    def set_board(self, board):
+        """
+        Fits the tiles to the visible area of the board and draws it.
+
+        :param board: Board, the board to display
+        """
+        self.__board = board
+        self.__first_row = 0
+        self.__first_col = 0
+
+        rows = min(board.get_height(), MAX_VISIBLE_ROWS)
+        cols = min(board.get_width(), MAX_VISIBLE_COLS)
+        shifted = board.get_topology() == HEX
+        if shifted:
+            #  A hex board scrolls two rows at a time, so that the shifted rows
+            #  stay in place, and the last row must still be reachable.
+            rows -= (board.get_height() - rows) % 2
+        if shifted != self.__shifted:
+            self.__resize_tiles(0, 0)
+            self.__shifted = shifted
+        if (rows, cols) != (self.__visible_rows, self.__visible_cols):
+            self.__resize_tiles(rows, cols)
+
+        if rows < board.get_height():
+            self.__row_scrollbar.grid(row=0, column=1, sticky=NS)
+        else:
+            self.__row_scrollbar.grid_remove()
+        if cols < board.get_width():
+            self.__col_scrollbar.grid(row=1, column=0, sticky=EW)
+        else:
+            self.__col_scrollbar.grid_remove()
+
+        self.draw_all()
+
+    def __resize_tiles(self, rows, cols):
+        """
+        Resizes the set of tiles to a visible area of rows x cols. The tiles
+        are kept between games, so only the rows and columns that are added
+        or removed create or delete canvas items.
+
+        :param rows: int, number of visible rows
+        :param cols: int, number of visible columns
+        """
+        canvas = self.__canvas
+        tiles = self.__tiles
+        looks = dict(zip(self.__rectangles, self.__looks))
+
+        for row in tiles[rows:]:
+            for rectangle, text in row:
+                canvas.delete(rectangle, text)
+                self.__tk_calls += 1
+        del tiles[rows:]
+
+        for row_index, row in enumerate(tiles):
+            for rectangle, text in row[cols:]:
+                canvas.delete(rectangle, text)
+                self.__tk_calls += 1
+            del row[cols:]
+            for col in range(len(row), cols):
+                row.append(self.__create_tile(row_index, col))
+        for row_index in range(len(tiles), rows):
+            tiles.append([self.__create_tile(row_index, col)
+                          for col in range(cols)])
+
+        width = cols * FIELD_SIZE
+        if self.__shifted:
+            width += FIELD_SIZE // 2
+        canvas.configure(width=width, height=rows * FIELD_SIZE)
+        self.__tk_calls += 1
+        self.__rectangles = [rectangle for row in tiles
+                             for rectangle, _ in row]
+        self.__texts = [text for row in tiles for _, text in row]
+        self.__looks = [looks.get(rectangle, (CLOSED_COLOR, ""))
+                        for rectangle in self.__rectangles]
+        self.__visible_rows = rows
+        self.__visible_cols = cols
+
+    def __create_tile(self, row, col):
+        """
+        Creates the canvas items of a tile.
+
+        :param row: int, the row of the tile in the visible area
+        :param col: int, the column of the tile in the visible area
+        :return: (int, int), the item ids of the rectangle and the text
+        """
+        x = col * FIELD_SIZE
+        y = row * FIELD_SIZE
+        if self.__shifted and row % 2:
+            x += FIELD_SIZE // 2
+        rectangle = self.__canvas.create_rectangle(
+            x, y, x + FIELD_SIZE, y + FIELD_SIZE,
+            fill=CLOSED_COLOR, outline=OUTLINE_COLOR)
+        text = self.__canvas.create_text(
+            x + FIELD_SIZE // 2, y + FIELD_SIZE // 2, font=(FONT, 7))
+        self.__tk_calls += 2
+        return rectangle, text
+
+    def draw_all(self):
+        """
+        Marks every visible field to be redrawn.
+        """
+        self.__redraw_all = True
+        self.__dirty = []
+        self.__schedule_redraw()
+
+    def draw_fields(self, indices):
+        """
+        Marks the given fields to be redrawn. If more fields have changed than
+        there are tiles, the visible area is redrawn as a whole instead.
+
+        :param indices: list, the indices of the changed fields
+        """
+        if not self.__redraw_all:
+            self.__dirty.extend(indices)
+            if len(self.__dirty) > len(self.__rectangles):
+                self.__redraw_all = True
+                self.__dirty = []
+        self.__schedule_redraw()
+
+    def __schedule_redraw(self):
+        """
+        Schedules a redraw for when Tk is idle, unless one is already pending.
+        """
+        if not self.__redraw_pending:
+            self.__redraw_pending = True
+            self.__canvas.after_idle(self.__redraw)
+
+    def __redraw(self):
+        """
+        Draws the fields that have been marked since the last redraw.
+        """
+        self.__redraw_pending = False
+        if self.__board is None:
+            return
+        profiler = get_profiler()
+        start = profiler.start()
+        if self.__redraw_all:
+            self.__redraw_visible()
+        else:
+            self.__redraw_dirty()
+        self.__redraw_all = False
+        self.__dirty = []
+
+        profiler.record("redraw", start, self.__tk_calls)
+        profiler.count_tk_calls(self.__tk_calls)
+        profiler.end_action()
+        self.__tk_calls = 0
+
+    def __redraw_visible(self):
+        """
+        Draws every visible field and updates the scrollbars. The visible
+        area is loaded first, in case the board is generated as it is
+        explored.
+        """
+        self.__board.load_area(self.__first_row, self.__first_col,
+                               self.__visible_rows, self.__visible_cols)
+        width = self.__board.get_width()
+        cols = self.__visible_cols
+        for row in range(self.__visible_rows):
+            index = (self.__first_row + row) * width + self.__first_col
+            tile = row * cols
+            for col in range(cols):
+                self.__draw(tile + col, index + col)
+
+        rows = self.__board.get_height()
+        self.__row_scrollbar.set(
+            self.__first_row / rows,
+            (self.__first_row + self.__visible_rows) / rows)
+        self.__col_scrollbar.set(
+            self.__first_col / width,
+            (self.__first_col + self.__visible_cols) / width)
+        self.__tk_calls += 2
+
+    def __redraw_dirty(self):
+        """
+        Draws the marked fields that are in the visible area.
+        """
+        width = self.__board.get_width()
+        for index in self.__dirty:
+            row = index // width - self.__first_row
+            col = index % width - self.__first_col
+            if 0 <= row < self.__visible_rows \
+                    and 0 <= col < self.__visible_cols:
+                self.__draw(row * self.__visible_cols + col, index)
+
+    def __draw(self, tile, index):
+        """
+        Changes the color and text of a tile to match the field, unless it
+        already does.
+
+        :param tile: int, index of the tile
+        :param index: int, index of the field
+        """
+        board = self.__board
+        text = ""
+        if board.is_opened(index):
+            mines = board.get_value(index)
+            if mines == 0:
+                text = mines
+                color = ZERO_COLOR
+            elif mines == MINE:
+                color = MINE_COLOR
+            else:
+                text = mines
+                color = OPENED_COLOR
+        elif board.is_flagged(index):
+            color = FLAGGED_COLOR
+        else:
+            color = CLOSED_COLOR
+
+        color_shown, text_shown = self.__looks[tile]
+        if color != color_shown:
+            self.__canvas.itemconfigure(self.__rectangles[tile], fill=color)
+            self.__tk_calls += 1
+        if text != text_shown:
+            self.__canvas.itemconfigure(self.__texts[tile], text=text)
+            self.__tk_calls += 1
+        self.__looks[tile] = (color, text)
+
+    def scroll_rows(self, *args):
+        """
+        Scrolls the visible area vertically. Called by the vertical scrollbar.
+        """
+        get_profiler().start_action("scroll")
+        first_row = self.__scroll(args, self.__first_row,
+                                  self.__visible_rows,
+                                  self.__board.get_height())
+        if self.__shifted and first_row % 2:
+            first_row += 1 if first_row > self.__first_row else -1
+        self.__first_row = first_row
+        self.draw_all()
+
+    def scroll_cols(self, *args):
+        """
+        Scrolls the visible area horizontally. Called by the horizontal
+        scrollbar.
+        """
+        get_profiler().start_action("scroll")
+        self.__first_col = self.__scroll(args, self.__first_col,
+                                         self.__visible_cols,
+                                         self.__board.get_width())
+        self.draw_all()
+
+    def __scroll(self, args, first, visible, total):
+        """
+        :param args: tuple, the arguments given by the scrollbar, either
+        ("moveto", fraction) or ("scroll", number, "units" or "pages")
+        :param first: int, the first visible row or column
+        :param visible: int, number of visible rows or columns
+        :param total: int, number of rows or columns on the board
+        :return: int, the new first visible row or column
+        """
+        if args[0] == "moveto":
+            first = round(float(args[1]) * total)
+        elif args[2] == "pages":
+            first += int(args[1]) * visible
+        else:
+            first += int(args[1])
+        return max(0, min(first, total - visible))
+
+    def get_field(self, event):
+        """
+        :param event: Event, a mouse event on the canvas
+        :return: (int, int), the row and column index of the clicked field,
+        or None if the click was outside the fields
+        """
+        row = event.y // FIELD_SIZE
+        x = event.x
+        if self.__shifted and row % 2:
+            x -= FIELD_SIZE // 2
+        col = x // FIELD_SIZE
+        if not (0 <= row < self.__visible_rows
+                and 0 <= col < self.__visible_cols):
+            return None
+        return self.__first_row + row, self.__first_col + col
+
+    def open_on_press(self, event):
+        """
+        Opens the clicked field.
+        """
+        get_profiler().start_action("open")
+        field = self.get_field(event)
+        if field is not None:
+            self.__grid_object.open_on_press(*field)
+
+    def flag(self, event):
+        """
+        Flags the clicked field.
+        """
+        get_profiler().start_action("flag")
+        field = self.get_field(event)
+        if field is not None:
+            self.__grid_object.flag_field(*field)
+
+    def get_frame(self):
+        """
+        :return: Frame, the frame that holds the canvas and the scrollbars
+        """
+        return self.__frame
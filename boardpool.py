@@ -0,0 +1,245 @@
+import random
+import time
+from collections import deque
+
+from board import Board
+from solver import Solver
+from topology import SQUARE
+
+#  How many boards of each kind are kept ready.
+QUEUE_SIZE = 4
+
+#  How many fields of candidate boards a worker goes through before giving
+#  up, about a thousand boards of 20x40. Hard boards of that size can be
+#  solved without guessing a couple of times in a hundred, so a kind of board
+#  that fails this many times in a row practically never can.
+MAX_FIELDS = 1000000
+
+#  The search that the workers of a pool are on, shared with the pool. A
+#  worker gives up its board as soon as the pool has moved on to another
+#  search, see BoardPool.fill().
+_search = None
+
+
+def get_start(height, width):
+    """
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :return: (int, int), the row and column index of the field that a
+    no-guess game is started from
+    """
+    return height // 2, width // 2
+
+
+def find_no_guess_seed(height, width, difficulty, topology, seed,
+                       cancelled=None):
+    """
+    Generates candidate boards until one can be solved from the start field
+    without guessing. The board is played the same way a game is: the mines
+    around the start field are moved away before it is opened. Because the
+    board generates and moves its mines with a random number generator of its
+    own, the seed is all that is needed to create the same board again.
+
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :param difficulty: int, the percentage of fields that have a mine
+    :param topology: str, the shape of the board, SQUARE, TORUS or HEX
+    :param seed: int, the seed that the candidate seeds are drawn with
+    :param cancelled: function, called between candidates, the search is
+    given up once it returns True
+    :return: int, the seed of a board that can be solved without guessing,
+    or None if none was found
+    """
+    candidates = random.Random(seed)
+    board = Board(height, width, topology)
+    start = board.get_index(*get_start(height, width))
+    for _ in range(max(MAX_FIELDS // (height * width), 1)):
+        if cancelled is not None and cancelled():
+            return None
+        candidate = candidates.getrandbits(64)
+        board.generate(difficulty, candidate)
+        board.move_mines_away(start)
+        if Solver(board).solve(start):
+            return candidate
+    return None
+
+
+def _start_worker(search):
+    """
+    Runs in every worker process as it starts.
+
+    :param search: multiprocessing.Value, the search the pool is on
+    """
+    global _search
+    _search = search
+
+
+def _find_for_pool(height, width, difficulty, topology, seed, search):
+    """
+    Looks for a no-guess board in a worker of the pool, see
+    find_no_guess_seed(), until the pool moves on to another search.
+
+    :param search: int, the number of the search that the board is for
+    :return: int, the seed of the board, or None if none was found or the
+    search was given up
+    """
+    return find_no_guess_seed(height, width, difficulty, topology, seed,
+                              lambda: _search.value != search)
+
+
+class BoardPool:
+    """
+    Keeps a few no-guess boards of every kind that has been asked for ready
+    in the background. Finding a no-guess board can take hundreds of
+    candidates, so the candidates are generated and solved in a pool of
+    worker processes while the game is played. Only the seeds of the found
+    boards are sent back, and the boards are created again from them.
+
+    Everything but the workers runs in the thread of the user interface: the
+    finished workers are collected whenever a board is asked for. Only one
+    kind of board is looked for at a time. When another kind is asked for,
+    the workers give up the boards of the previous kind after the candidate
+    they are on, so they don't hold up the boards that are wanted now.
+    """
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE):
+        """
+        :param workers: int, number of worker processes, or None for one
+        per processor
+        :param queue_size: int, how many boards of each kind are kept ready
+        """
+        self.__workers = workers
+        self.__queue_size = queue_size
+        #  The pool is only started once a board is asked for.
+        self.__executor = None
+        #  The number of the search, shared with the workers, and the kind of
+        #  board that it is for.
+        self.__search = None
+        self.__kind = None
+
+        #  The ready seeds, the workers still searching and the kinds of
+        #  boards that no worker could find, by (height, width, difficulty,
+        #  topology).
+        self.__ready = {}
+        self.__pending = {}
+        self.__impossible = set()
+
+    def fill(self, height, width, difficulty, topology=SQUARE):
+        """
+        Starts workers until enough boards of the kind are ready or being
+        searched for.
+
+        :param height: int, number of rows on the board
+        :param width: int, number of columns on the board
+        :param difficulty: int, the percentage of fields that have a mine
+        :param topology: str, the shape of the board, SQUARE, TORUS or HEX
+        """
+        kind = (height, width, difficulty, topology)
+        self.__collect(kind)
+        if kind in self.__impossible:
+            return
+        if self.__executor is None:
+            #  The pool is imported only now, as the multiprocessing modules
+            #  behind it would take a good part of the startup of the user
+            #  interface to import.
+            from concurrent.futures import ProcessPoolExecutor
+            from multiprocessing import Value
+            self.__search = Value("q", 0, lock=False)
+            self.__executor = ProcessPoolExecutor(
+                self.__workers, initializer=_start_worker,
+                initargs=(self.__search,))
+            self.__kind = None
+        if kind != self.__kind:
+            self.__cancel()
+            self.__kind = kind
+
+        ready = self.__ready.setdefault(kind, deque())
+        pending = self.__pending.setdefault(kind, [])
+        while len(ready) + len(pending) < self.__queue_size:
+            pending.append(self.__executor.submit(
+                _find_for_pool, *kind, random.getrandbits(64),
+                self.__search.value))
+
+    def get_seed(self, height, width, difficulty, topology=SQUARE,
+                 timeout=None):
+        """
+        Takes the seed of a ready no-guess board of the kind and starts
+        looking for the next one. If no board is ready, waits for one.
+
+        :param height: int, number of rows on the board
+        :param width: int, number of columns on the board
+        :param difficulty: int, the percentage of fields that have a mine
+        :param topology: str, the shape of the board, SQUARE, TORUS or HEX
+        :param timeout: float, the longest time in seconds to wait for a
+        board, or None to wait until the workers are done
+        :return: int, the seed of the board, see find_no_guess_seed(), or
+        None if no board was found in time
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        kind = (height, width, difficulty, topology)
+        self.fill(*kind)
+        ready = self.__ready.get(kind)
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        while not ready and self.__pending.get(kind):
+            if timeout is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            wait(self.__pending[kind], timeout, FIRST_COMPLETED)
+            self.__collect(kind)
+        if not ready:
+            return None
+        seed = ready.popleft()
+        self.fill(*kind)
+        return seed
+
+    def __collect(self, kind):
+        """
+        Moves the seeds found by the finished workers to the ready ones. A
+        kind of board whose worker gave up or failed is no longer looked for,
+        but one whose pool broke down is looked for again in a new pool.
+
+        :param kind: tuple, (height, width, difficulty, topology)
+        """
+        pending = self.__pending.get(kind, [])
+        for future in [future for future in pending if future.done()]:
+            pending.remove(future)
+            try:
+                seed = future.result()
+            except Exception:
+                #  A broken pool is dropped, so that the next board asked for
+                #  starts a new one. A worker that failed on its own is taken
+                #  the same as a kind that can't be found.
+                from concurrent.futures import BrokenExecutor
+                if isinstance(future.exception(), BrokenExecutor):
+                    self.shutdown()
+                    return
+                seed = None
+            if seed is None:
+                self.__impossible.add(kind)
+            else:
+                self.__ready[kind].append(seed)
+
+    def __cancel(self):
+        """
+        Gives up the boards being searched for. The workers that are on a
+        board stop after their current candidate.
+        """
+        self.__search.value += 1
+        for pending in self.__pending.values():
+            for future in pending:
+                future.cancel()
+        self.__pending = {}
+
+    def shutdown(self):
+        """
+        Stops the workers. Boards that are being searched for are abandoned,
+        so the workers end after their current candidate instead of keeping
+        the program from exiting until they are done.
+        """
+        if self.__executor is not None:
+            self.__cancel()
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+        self.__pending = {}
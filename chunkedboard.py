@@ -0,0 +1,548 @@
+import os
+import random
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+
+from board import Board, MINE, CLOSED, OPENED, FLAGGED
+from topology import SQUARE
+
+#  The height and width of a chunk in fields.
+CHUNK_SIZE = 64
+
+#  How many chunks are kept in memory. The least recently used chunk is
+#  evicted first: chunks that have been played on are saved to disk, the
+#  rest are simply dropped and generated again when needed.
+MAX_LOADED_CHUNKS = 256
+
+#  How many new chunks one flood fill may load. The zeros that the fill
+#  reaches in further chunks are opened once those chunks come into view, so
+#  that a huge region of zeros on a sparse board doesn't open all at once.
+MAX_FILL_CHUNKS = 4
+
+#  How many mine layouts of chunks are cached. Loading a chunk needs the
+#  layouts of the chunks around it too.
+CACHED_LAYOUTS = 64
+
+
+@lru_cache(maxsize=CACHED_LAYOUTS)
+def get_chunk_mines(seed, difficulty, chunk_row, chunk_col, height, width):
+    """
+    Places the mines of a chunk. The layout only depends on the seed of the
+    board and the position of the chunk, so any chunk can be generated on
+    its own, in any order.
+
+    :param seed: int, the seed of the board
+    :param difficulty: int, the percentage of fields that have a mine
+    :param chunk_row: int, row index of the chunk
+    :param chunk_col: int, column index of the chunk
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :return: bytes, MINE for every field of the chunk that has a mine and 0
+    for the others, row by row
+    """
+    rows = min(CHUNK_SIZE, height - chunk_row * CHUNK_SIZE)
+    cols = min(CHUNK_SIZE, width - chunk_col * CHUNK_SIZE)
+    fields = [row * CHUNK_SIZE + col
+              for row in range(rows) for col in range(cols)]
+    generator = random.Random(f"{seed}:{chunk_row}:{chunk_col}")
+
+    mines = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+    for field in generator.sample(fields,
+                                  round(len(fields) * difficulty / 100)):
+        mines[field] = MINE
+    return bytes(mines)
+
+
+class ChunkedBoard:
+    """
+    A board that is generated a chunk of CHUNK_SIZE x CHUNK_SIZE fields at a
+    time, when a flood fill or the visible area reaches the chunk. Memory and
+    generation time follow the explored area instead of the size of the
+    board, so the board can be practically endless.
+
+    The mines of each chunk come from the seed of the board and the position
+    of the chunk. The number of mines surrounding the fields of a chunk is
+    counted on a scratch board two fields larger on every side, since mines
+    surrounded by mines are turned into ordinary fields like on a Board.
+    Only the open/flag state of a chunk can't be generated again, so only
+    chunks that have been played on are saved to disk when they are evicted.
+
+    The board has the same interface as a Board for playing, except that
+    there is no end to how many mines it has, so it can't be won and a lost
+    game only opens the loaded chunks. Only the square topology is supported.
+    """
+    def __init__(self, height, width):
+        """
+        :param height: int, number of rows on the board
+        :param width: int, number of columns on the board
+        """
+        self.__height = height
+        self.__width = width
+        self.__difficulty = 0
+        self.__seed = None
+
+        #  The loaded chunks as [values, state] by (chunk row, chunk col),
+        #  the least recently used first.
+        self.__chunks = OrderedDict()
+        #  The chunks that have been saved to disk, and the zeros that a
+        #  flood fill has reached in each chunk that it didn't load, as local
+        #  indices by chunk.
+        self.__saved = set()
+        self.__pending = {}
+        #  The fields that may not have a mine, as the mines around the first
+        #  opened field are moved away.
+        self.__cleared = set()
+        self.__directory = None
+        self.__scratch = Board(CHUNK_SIZE + 4, CHUNK_SIZE + 4)
+
+        self.__flags = 0
+        self.__exploded = False
+        self.__all_opened = False
+
+    def generate(self, difficulty, seed=None):
+        """
+        Starts a new game on the board. No chunk is generated until it is
+        needed.
+
+        :param difficulty: int, the percentage of fields that have a mine
+        :param seed: int, the seed of the board, or None for a random one
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.__seed = seed
+        self.__difficulty = difficulty
+        self.__chunks.clear()
+        self.__saved.clear()
+        self.__pending.clear()
+        self.__cleared.clear()
+        if self.__directory is not None:
+            for name in os.listdir(self.__directory):
+                os.remove(os.path.join(self.__directory, name))
+        self.__flags = 0
+        self.__exploded = False
+        self.__all_opened = False
+
+    def move_mines_away(self, index):
+        """
+        Removes the mines in and around the field, so that it opens as a
+        zero. On an endless board there is no fixed number of mines to keep,
+        so the mines aren't placed anywhere else.
+
+        :param index: int, index of the field
+        """
+        row, col = self.get_row_col(index)
+        for r in range(row - 1, row + 2):
+            for c in range(col - 1, col + 2):
+                if 0 <= r < self.__height and 0 <= c < self.__width:
+                    self.__cleared.add(self.get_index(r, c))
+
+        #  The numbers of the loaded chunks next to the field change.
+        chunk_row = row // CHUNK_SIZE
+        chunk_col = col // CHUNK_SIZE
+        for key in self.__chunks:
+            if abs(key[0] - chunk_row) <= 1 and abs(key[1] - chunk_col) <= 1:
+                self.__chunks[key][0] = self.__count_mines(*key)
+
+    def __count_mines(self, chunk_row, chunk_col):
+        """
+        Counts the number of mines surrounding every field of a chunk. The
+        mines of the chunk and the two nearest rows and columns of fields
+        around it are copied to the scratch board, and the mines are counted
+        there as on any board.
+
+        :param chunk_row: int, row index of the chunk
+        :param chunk_col: int, column index of the chunk
+        :return: bytearray, the values of the fields of the chunk
+        """
+        size = CHUNK_SIZE + 4
+        padded = bytearray(size * size)
+        first_row = chunk_row * CHUNK_SIZE - 2
+        first_col = chunk_col * CHUNK_SIZE - 2
+        for row_offset in (-1, 0, 1):
+            for col_offset in (-1, 0, 1):
+                r = chunk_row + row_offset
+                c = chunk_col + col_offset
+                if not (0 <= r * CHUNK_SIZE < self.__height
+                        and 0 <= c * CHUNK_SIZE < self.__width):
+                    continue
+                mines = get_chunk_mines(self.__seed, self.__difficulty, r, c,
+                                        self.__height, self.__width)
+                #  The part of the chunk that is on the scratch board.
+                rows = range(max(r * CHUNK_SIZE, first_row),
+                             min((r + 1) * CHUNK_SIZE, first_row + size))
+                cols = range(max(c * CHUNK_SIZE, first_col),
+                             min((c + 1) * CHUNK_SIZE, first_col + size))
+                for row in rows:
+                    source = (row - r * CHUNK_SIZE) * CHUNK_SIZE \
+                        + cols[0] - c * CHUNK_SIZE
+                    target = (row - first_row) * size + cols[0] - first_col
+                    padded[target:target + len(cols)] = \
+                        mines[source:source + len(cols)]
+
+        for index in self.__cleared:
+            row, col = self.get_row_col(index)
+            if 0 <= row - first_row < size and 0 <= col - first_col < size:
+                padded[(row - first_row) * size + col - first_col] = 0
+
+        scratch = self.__scratch
+        scratch.get_values()[:] = padded
+        scratch.calculate_mines()
+        values = scratch.get_values()
+        return bytearray(b"".join(
+            values[row * size + 2:row * size + 2 + CHUNK_SIZE]
+            for row in range(2, 2 + CHUNK_SIZE)))
+
+    def __get_chunk(self, key):
+        """
+        Returns a chunk, loading it from disk or generating it if it isn't
+        in memory, and evicts the least recently used chunks if there are
+        too many.
+
+        :param key: (int, int), row and column index of the chunk
+        :return: list, [values, state] of the chunk
+        """
+        chunk = self.__chunks.get(key)
+        if chunk is not None:
+            self.__chunks.move_to_end(key)
+            return chunk
+
+        values = self.__count_mines(*key)
+        if key in self.__saved:
+            with open(self.__get_path(key), "rb") as saved:
+                state = bytearray(saved.read())
+        else:
+            state = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+            if self.__all_opened:
+                state[:] = bytes([OPENED]) * len(state)
+        chunk = self.__chunks[key] = [values, state]
+
+        while len(self.__chunks) > MAX_LOADED_CHUNKS:
+            old_key, (_, old_state) = self.__chunks.popitem(last=False)
+            if old_state.count(CLOSED) != len(old_state):
+                self.__save(old_key, old_state)
+            elif old_key in self.__saved:
+                #  A chunk that has been closed again, by unflagging, is
+                #  generated again instead of being loaded, so the state that
+                #  it was saved with is removed.
+                os.remove(self.__get_path(old_key))
+                self.__saved.discard(old_key)
+        return chunk
+
+    def __save(self, key, state):
+        """
+        Saves the state of a chunk to disk.
+
+        :param key: (int, int), row and column index of the chunk
+        :param state: bytearray, the state of the fields of the chunk
+        """
+        if self.__directory is None:
+            #  Only endless games that go far save chunks, so the modules are
+            #  imported here instead of at the startup of the program.
+            import shutil
+            import tempfile
+            self.__directory = tempfile.mkdtemp(prefix="minesweeper-")
+            #  The saved chunks are removed with the board, or at the latest
+            #  when the program ends.
+            weakref.finalize(self, shutil.rmtree, self.__directory, True)
+        with open(self.__get_path(key), "wb") as saved:
+            saved.write(state)
+        self.__saved.add(key)
+
+    def __get_path(self, key):
+        """
+        :param key: (int, int), row and column index of the chunk
+        :return: str, the path of the file that the chunk is saved in
+        """
+        return os.path.join(self.__directory, f"{key[0]}_{key[1]}")
+
+    def __locate(self, index):
+        """
+        :param index: int, index of the field
+        :return: ((int, int), int), the chunk of the field and the index of
+        the field within the chunk
+        """
+        row, col = divmod(index, self.__width)
+        return (row // CHUNK_SIZE, col // CHUNK_SIZE), \
+            row % CHUNK_SIZE * CHUNK_SIZE + col % CHUNK_SIZE
+
+    def load_area(self, row, col, height, width):
+        """
+        Loads the chunks of an area that has come into view, and opens the
+        zeros that flood fills have left waiting in them. The zeros are only
+        opened as far as the loaded chunks go, so scrolling opens a region
+        of zeros bit by bit.
+
+        :param row: int, the first row of the area
+        :param col: int, the first column of the area
+        :param height: int, number of rows in the area
+        :param width: int, number of columns in the area
+        :return: list, the indices of the fields that were opened
+        """
+        waiting = False
+        for chunk_row in range(row // CHUNK_SIZE,
+                               (row + height - 1) // CHUNK_SIZE + 1):
+            for chunk_col in range(col // CHUNK_SIZE,
+                                   (col + width - 1) // CHUNK_SIZE + 1):
+                key = (chunk_row, chunk_col)
+                self.__get_chunk(key)
+                waiting = waiting or key in self.__pending
+        if not waiting:
+            return []
+        return self.__fill({}, 0)
+
+    def open_field(self, index):
+        """
+        Opens the field. Opening a field also unflags it.
+
+        :param index: int, index of the field
+        :return: bool, True if the field was opened, False if it already was
+        """
+        key, local = self.__locate(index)
+        values, state = self.__get_chunk(key)
+        if state[local] == OPENED:
+            return False
+        self.unflag(index)
+        state[local] = OPENED
+        if values[local] == MINE:
+            self.__exploded = True
+        return True
+
+    def open_connected_zeros(self, index):
+        """
+        Opens the field and, if it is a zero, all the zeros connected to it and
+        their surrounding fields. Flagged fields are left closed. The fill
+        loads at most MAX_FILL_CHUNKS new chunks; the zeros it reaches beyond
+        them are opened by load_area() once they come into view.
+
+        :param index: int, index of the field
+        :return: list, the indices of the fields that were opened
+        """
+        if self.is_opened(index) or self.is_flagged(index):
+            return []
+        if self.get_value(index) != 0:
+            self.open_field(index)
+            return [index]
+        key, local = self.__locate(index)
+        return self.__fill({key: [local]}, MAX_FILL_CHUNKS)
+
+    def __fill(self, work, new_chunks):
+        """
+        Opens the fields waiting to be opened and the zeros connected to them,
+        one chunk at a time. The fields that the fill reaches in another
+        chunk are added to the work of that chunk, and the zeros waiting in
+        the loaded chunks are opened too.
+
+        :param work: dict, the local indices of the fields to open by chunk
+        :param new_chunks: int, how many chunks that aren't in memory may be
+        loaded; the fields reached in other chunks are left waiting
+        :return: list, the indices of the fields that were opened
+        """
+        height = self.__height
+        width = self.__width
+        chunks = self.__chunks
+        pending = self.__pending
+        for key in [key for key in pending if key in chunks]:
+            work.setdefault(key, []).extend(pending.pop(key))
+
+        revealed = []
+        while work:
+            key, stack = work.popitem()
+            if key not in chunks:
+                if not new_chunks:
+                    pending.setdefault(key, []).extend(stack)
+                    continue
+                new_chunks -= 1
+                stack.extend(pending.pop(key, ()))
+            values, state = self.__get_chunk(key)
+
+            first_row = key[0] * CHUNK_SIZE
+            first_col = key[1] * CHUNK_SIZE
+            base = first_row * width + first_col
+            rows = min(CHUNK_SIZE, height - first_row)
+            cols = min(CHUNK_SIZE, width - first_col)
+            while stack:
+                local = stack.pop()
+                if state[local] != CLOSED:
+                    continue
+                state[local] = OPENED
+                row, col = divmod(local, CHUNK_SIZE)
+                revealed.append(base + row * width + col)
+                if values[local]:
+                    continue
+
+                for r in (row - 1, row, row + 1):
+                    for c in (col - 1, col, col + 1):
+                        if 0 <= r < rows and 0 <= c < cols:
+                            stack.append(r * CHUNK_SIZE + c)
+                        elif 0 <= first_row + r < height \
+                                and 0 <= first_col + c < width:
+                            #  The field is in the next chunk over.
+                            work.setdefault(
+                                (key[0] + r // CHUNK_SIZE,
+                                 key[1] + c // CHUNK_SIZE), []).append(
+                                r % CHUNK_SIZE * CHUNK_SIZE + c % CHUNK_SIZE)
+        return revealed
+
+    def flag(self, index):
+        """
+        Flags the field, unless it has already been opened.
+
+        :param index: int, index of the field
+        :return: bool, True if the field was flagged, False if not
+        """
+        key, local = self.__locate(index)
+        state = self.__get_chunk(key)[1]
+        if state[local] != CLOSED:
+            return False
+        state[local] = FLAGGED
+        self.__flags += 1
+        return True
+
+    def unflag(self, index):
+        """
+        Removes the flag from the field.
+
+        :param index: int, index of the field
+        :return: bool, True if the field was flagged, False if not
+        """
+        key, local = self.__locate(index)
+        state = self.__get_chunk(key)[1]
+        if state[local] != FLAGGED:
+            return False
+        state[local] = CLOSED
+        self.__flags -= 1
+        return True
+
+    def open_all(self):
+        """
+        Opens all fields on the board. Only the loaded chunks are gone
+        through; the rest are opened as they are loaded.
+
+        :return: list, the indices of the loaded fields that were opened
+        """
+        self.__all_opened = True
+        opened = []
+        for key, (_, state) in self.__chunks.items():
+            base = key[0] * CHUNK_SIZE * self.__width + key[1] * CHUNK_SIZE
+            rows = min(CHUNK_SIZE, self.__height - key[0] * CHUNK_SIZE)
+            cols = min(CHUNK_SIZE, self.__width - key[1] * CHUNK_SIZE)
+            for row in range(rows):
+                for col in range(cols):
+                    if state[row * CHUNK_SIZE + col] != OPENED:
+                        opened.append(base + row * self.__width + col)
+            state[:] = bytes([OPENED]) * len(state)
+        self.__pending.clear()
+        self.__flags = 0
+        return opened
+
+    def get_neighbors(self, index):
+        """
+        :param index: int, index of the field
+        :return: list, the indices of the fields surrounding the field
+        """
+        row, col = divmod(index, self.__width)
+        return [r * self.__width + c
+                for r in range(max(row - 1, 0), min(row + 2, self.__height))
+                for c in range(max(col - 1, 0), min(col + 2, self.__width))
+                if (r, c) != (row, col)]
+
+    def get_index(self, row, col):
+        """
+        :param row: int, row index of the field
+        :param col: int, column index of the field
+        :return: int, the index of the field
+        """
+        return row * self.__width + col
+
+    def get_row_col(self, index):
+        """
+        :param index: int, index of the field
+        :return: (int, int), the row and column index of the field
+        """
+        return divmod(index, self.__width)
+
+    def get_value(self, index):
+        """
+        :param index: int, index of the field
+        :return: int, number of mines surrounding the field (or 9 if mine)
+        """
+        key, local = self.__locate(index)
+        return self.__get_chunk(key)[0][local]
+
+    def is_mine(self, index):
+        """
+        :param index: int, index of the field
+        :return: bool, True if the field has a mine, False if not
+        """
+        return self.get_value(index) == MINE
+
+    def is_opened(self, index):
+        """
+        :param index: int, index of the field
+        :return: bool, True if the field has been opened, False if not
+        """
+        key, local = self.__locate(index)
+        return self.__get_chunk(key)[1][local] == OPENED
+
+    def is_flagged(self, index):
+        """
+        :param index: int, index of the field
+        :return: bool, True if the field has been flagged, False if not
+        """
+        key, local = self.__locate(index)
+        return self.__get_chunk(key)[1][local] == FLAGGED
+
+    def is_won(self):
+        """
+        :return: bool, always False, as there is no end to the mines
+        """
+        return False
+
+    def is_lost(self):
+        """
+        :return: bool, True if a mine has been opened, False if not
+        """
+        return self.__exploded
+
+    def get_flags(self):
+        """
+        :return: int, number of flagged fields
+        """
+        return self.__flags
+
+    def get_loaded_chunks(self):
+        """
+        :return: int, number of chunks in memory
+        """
+        return len(self.__chunks)
+
+    def get_saved_chunks(self):
+        """
+        :return: int, number of chunks that have been saved to disk
+        """
+        return len(self.__saved)
+
+    def get_seed(self):
+        """
+        :return: int, the seed the board was generated with
+        """
+        return self.__seed
+
+    def get_topology(self):
+        """
+        :return: str, the shape of the board, always SQUARE
+        """
+        return SQUARE
+
+    def get_height(self):
+        """
+        :return: int, number of rows on the board
+        """
+        return self.__height
+
+    def get_width(self):
+        """
+        :return: int, number of columns on the board
+        """
+        return self.__width
@@ -1,121 +1,451 @@
-from field import Field
+from board import Board
+from chunkedboard import ChunkedBoard
+from history import History, find_changes, make_diff
+from moves import REVEAL, FLAG, CHORD, CHECK
+from profiler import get_profiler
+from savefile import SAVE_FILE, save, load
+from topology import SQUARE
+
+#  The seeds of the boards are saved and logged as unsigned 64-bit numbers,
+#  so other seeds are reduced to their lowest 64 bits.
+SEED_MASK = (1 << 64) - 1
 
 class GameGrid:
     """
-    A GameGrid object is the grid in which the fields are situated.
+    A GameGrid object is the grid in which the fields are situated. The state
+    of the game is stored on a headless Board. After each action the user
+    interface is given one list of the fields that changed.
     """
     def __init__(self):
-        self.__grid = []
+        self.__board = None
+        self.__ui = None
+        self.__difficulty = 0
+        self.__first_click_safe = False
+        self.__started = False
+        #  The move log that the moves are written to, and whether the moves
+        #  of the current game are logged. A game loaded from a save file
+        #  isn't, as it can't be replayed from its start.
+        self.__move_log = None
+        self.__logged = False
+        #  None while the game is on, True if it was won and False if lost.
+        self.__result = None
+        #  The moves of the current game for undo and redo, or None if the
+        #  board doesn't keep a history.
+        self.__history = None
 
-    def generate_fields(self, grid_height, grid_width, difficulty, ui):
+    def generate_fields(self, grid_height, grid_width, difficulty, ui=None,
+                        seed=None, first_click_safe=False,
+                        topology=SQUARE, endless=False):
         """
-        Creates the fields and stores them in a list within a list. The fields
-        can then be accessed through that list, where the list indices
-        correspond to the rows and columns of the grid.
+        Creates the board that the fields are stored in. The board of the
+        previous game is reused if it has the same size and shape. If no user
+        interface is given, the game is played headless.
 
         :param grid_height: int, number of rows in the grid
         :param grid_width: int, number of columns in the grid
-        :param difficulty: int, the probability (%) of a mine being spawned in
-        a single grid
+        :param difficulty: int, the percentage of fields that have a mine
         :param ui: UI, the user interface object that the grid is displayed on
+        :param seed: int, the seed of the board, or None for a random one
+        :param first_click_safe: bool, True if the mines around the first
+        opened field should be moved elsewhere
+        :param topology: str, the shape of the board, SQUARE, TORUS or HEX
+        :param endless: bool, True if the board should be generated a chunk
+        at a time as it is explored, see ChunkedBoard
+        """
+        if seed is not None:
+            seed &= SEED_MASK
+        profiler = get_profiler()
+        start = profiler.start()
+        board = self.__board
+        if board is None or isinstance(board, ChunkedBoard) != endless \
+                or board.get_height() != grid_height \
+                or board.get_width() != grid_width \
+                or board.get_topology() != topology:
+            if endless:
+                self.__board = ChunkedBoard(grid_height, grid_width)
+            else:
+                self.__board = Board(grid_height, grid_width, topology)
+        self.__board.generate(difficulty, seed)
+        profiler.record("generate", start, grid_height * grid_width)
+        self.__ui = ui
+        self.__difficulty = difficulty
+        self.__first_click_safe = first_click_safe
+        self.__started = False
+        self.__result = None
+        #  Endless boards are only ever partly in memory, so there is no state
+        #  of the whole board to take the diffs of.
+        self.__history = None if endless else History()
+        self.__logged = self.__move_log is not None
+        if self.__logged:
+            self.__move_log.start_game(self.__board, difficulty,
+                                       first_click_safe)
+
+    def save_game(self, path=SAVE_FILE):
+        """
+        Saves the current game to a file. Endless boards can't be saved.
+
+        :param path: str, the path of the file
+        """
+        save(self.__board, self.__difficulty, self.__first_click_safe,
+             self.__started, self.__result, path)
+
+    def load_game(self, ui=None, path=SAVE_FILE):
+        """
+        Continues a game from a save file. A game that was already over when
+        it was saved stays over.
+
+        :param ui: UI, the user interface object that the grid is displayed on
+        :param path: str, the path of the file
+        """
+        board, settings = load(path)
+        self.__board = board
+        self.__ui = ui
+        self.__difficulty = settings["difficulty"]
+        self.__first_click_safe = settings["first_click_safe"]
+        self.__started = settings["started"]
+        self.__result = settings["result"]
+        if self.__result is None and board.is_lost():
+            #  Files saved before the result was saved only tell a lost game
+            #  apart, by its opened mines.
+            self.__result = False
+        self.__history = History(self.__result, self.__started)
+        self.__logged = False
+
+    def set_move_log(self, move_log):
+        """
+        Starts writing the moves of the games from the next one on to a move
+        log.
+
+        :param move_log: MoveLog, the log, or None to stop logging
+        """
+        self.__move_log = move_log
+
+    def apply_moves(self, moves):
+        """
+        Makes a batch of moves in one pass. The fields that the moves change
+        are drawn once, after all of the moves, and a field changed by more
+        than one move is only in the changes once. The flood fills of the
+        batch share the state of the board, so a fill that runs into fields
+        opened earlier in the batch stops there instead of going through
+        them again. The moves after the one that ends the game are left
+        unmade. The batch is recorded in the history as one move.
+
+        :param moves: list, (move, row, col) tuples, where the move is REVEAL,
+        FLAG or CHORD
+        :return: (list, bool), the indices of the changed fields and the
+        result of the game: True if won, False if lost and None if still on
+        """
+        board = self.__board
+        if self.__result is not None:
+            return [], self.__result
+
+        history = self.__history
+        if history is not None:
+            before = bytes(board.get_state())
+            #  Only the first opened field can move mines.
+            mines = None if self.__started or not self.__first_click_safe \
+                else board.get_mines()
+
+        changed = []
+        for move, row, col in moves:
+            index = board.get_index(row, col)
+            if move == REVEAL:
+                changed += self.__reveal(index)
+            elif move == FLAG:
+                changed += self.__flag(index)
+            elif move == CHORD:
+                changed += self.__chord(index)
+            else:
+                raise ValueError(f"unknown move {move!r}")
+            if board.is_lost() or board.is_won():
+                break
+
+        changed = list(dict.fromkeys(changed))
+        if self.__ui is not None and changed:
+            self.__ui.draw_fields(changed)
+        result = None
+        if board.is_lost():
+            result = False
+        elif board.is_won():
+            result = True
+        if history is not None and changed:
+            self.__record(changed, before, mines, result)
+        if result is not None:
+            self.end_game(result)
+        return changed, self.__result
+
+    def __record(self, changed, before, mines, result):
+        """
+        Records a batch of moves in the history.
+
+        :param changed: list, the indices of the fields the moves changed
+        :param before: bytes, the state of the fields before the moves
+        :param mines: bytes, the mines before the moves, or None if the
+        moves couldn't move any
+        :param result: bool, the result of the game after the moves
+        """
+        board = self.__board
+        after = board.get_state()
+        if mines is not None:
+            moved = board.get_mines()
+            indices = find_changes(mines, moved)
+            mines = make_diff(indices, mines, moved) if indices else None
+        self.__history.record(
+            make_diff(changed, before, after), result, self.__started, mines,
+            None if result is None else bytes(after))
+
+    def jump_to(self, position):
+        """
+        Moves the game to a point of its history, where position 0 is the
+        start of the game. The moves after the point can be redone until a
+        new move is made. A game whose moves have been undone is no longer
+        logged, as the log can't be replayed from its start.
+
+        :param position: int, the number of moves to have made
+        :return: list, the indices of the changed fields
+        """
+        history = self.__history
+        if history is None:
+            return []
+        board = self.__board
+        start = history.get_position()
+        if position == start:
+            return []
+        mines = history.crosses_mines(start, position)
+        changed = []
+        if self.__result is not None:
+            #  The fields opened at the end of the game are closed again.
+            final_state = history.get_final_state()
+            changed += find_changes(board.get_state(), final_state)
+            board.set_state(final_state)
+        for indices, states in history.seek(position):
+            board.set_fields(indices, states)
+            changed += indices
+        #  The numbers are recalculated with the fields already in place, so
+        #  that the counters of the board come out right.
+        if mines is not None:
+            board.set_mines(*mines)
+        self.__result, self.__started = history.get_result()
+        if self.__result is not None:
+            changed += board.open_all()
+        self.__logged = False
+
+        changed = list(dict.fromkeys(changed))
+        if self.__ui is not None and changed:
+            self.__ui.draw_fields(changed)
+        return changed
+
+    def undo(self):
+        """
+        Takes back the latest move, a game over included.
+
+        :return: list, the indices of the changed fields
+        """
+        if self.__history is None or not self.__history.get_position():
+            return []
+        return self.jump_to(self.__history.get_position() - 1)
+
+    def redo(self):
+        """
+        Makes the latest undone move again.
+
+        :return: list, the indices of the changed fields
+        """
+        history = self.__history
+        if history is None or history.get_position() == history.get_length():
+            return []
+        return self.jump_to(history.get_position() + 1)
+
+    def __reveal(self, index):
+        """
+        Opens a field, and if it is a zero, the zeros connected to it and
+        their surrounding fields.
+
+        :param index: int, index of the field
+        :return: list, the indices of the fields that were opened
         """
-        for row in range(grid_height):
-            self.__grid.append([])
-            for col in range(grid_width):
-                self.__grid[row].append(Field(row, col, difficulty, ui, self))
-
-        #  Once the fields have been created, calculate_mines() is called on
-        #  each field in the grid.
-        for row in range(grid_height):
-            for col in range(grid_width):
-                self.__grid[row][col].calculate_mines()
-
-    def open_connected_zeros(self, row, col):
-        """
-        This is called when a zero is opened manually by clicking it. Checks if
-        there are other zeros connected and opens them all.
-
-        :param row: int, row index of the manually opened zero
-        :param col: int, column index of the manually opened zero
-        """
-        #  connected_zeros includes the zeros that have been found, but have
-        #  not yet been handled. At first this only includes the manually
-        #  opened zero.
-        connected_zeros = {str(row) + ' ' + str(col): self.__grid[row][col]}
-        found = []
-        processed = []
-
-        #  This loop is executed until there are no more connected zeros to
-        #  handle (connected_zeros is epmty). Using a finite for-loop instead
-        #  of while to prevent an infinite loop in case something goes wrong.
-        for _ in range(800):
-            if not connected_zeros:
-                return
-
-            for field in connected_zeros:
-                row = connected_zeros[field].get_row()
-                col = connected_zeros[field].get_col()
-
-                #  Checks if the adjacent fields are zeros and adds them to
-                #  found if they are.
-                for i in [[row - 1, col - 1], [row, col - 1],
-                          [row + 1, col - 1], [row - 1, col],
-                          [row + 1, col], [row - 1, col + 1],
-                          [row, col + 1], [row + 1, col + 1]]:
-                    try:
-                        if self.__grid[i[0]][i[1]].get_mines() == 0 \
-                                and i[0] in range(len(self.__grid)) \
-                                and i[1] in range(len(self.__grid[i[0]])):
-                            found.append(str(i[0]) + ' ' + str(i[1]))
-                    except IndexError:
-                        pass
-
-                #  Opens the field and its adjacent fields, unless they are
-                #  flagged.
-                for j in [[row - 1, col - 1], [row, col - 1],
-                          [row + 1, col - 1], [row - 1, col],
-                          [row, col],
-                          [row + 1, col], [row - 1, col + 1],
-                          [row, col + 1], [row + 1, col + 1]]:
-                    if j[0] in range(len(self.__grid)) \
-                            and j[1] in range(
-                            len(self.__grid[j[0]])) and not \
-                            self.__grid[j[0]][j[1]].is_flagged():
-                        self.__grid[j[0]][j[1]].open_field()
-
-                processed.append(str(row) + ' ' + str(col))
-
-            #  Adds found fields to connected_zeros.
-            for field in found:
-                row, col = field.split()
-                connected_zeros[field] = self.__grid[int(row)][int(col)]
-
-            #  Once a field is handled and opened it gets removed from
-            #  connected_zeros.
-            for field in processed:
-                del connected_zeros[field]
+        board = self.__board
+        if board.is_opened(index):
+            return []
+        if self.__logged:
+            self.__move_log.append(REVEAL, index)
+
+        #  Opening a field also unflags it.
+        board.unflag(index)
+
+        if not self.__started:
+            self.__started = True
+            if self.__first_click_safe:
+                board.move_mines_away(index)
+
+        profiler = get_profiler()
+        start = profiler.start()
+        revealed = board.open_connected_zeros(index)
+        profiler.record("flood fill" if board.get_value(index) == 0
+                        else "open field", start, len(revealed))
+        return revealed
+
+    def __flag(self, index):
+        """
+        :param index: int, index of the field
+        :return: list, the index of the field if it was flagged
+        """
+        if not self.__board.flag(index):
+            return []
+        if self.__logged:
+            self.__move_log.append(FLAG, index)
+        return [index]
+
+    def __chord(self, index):
+        """
+        Opens the closed fields around an opened field that has as many
+        flags around it as it has mines. A field that isn't ready to be
+        chorded is left as it is.
+
+        :param index: int, index of the opened field
+        :return: list, the indices of the fields that were opened
+        """
+        board = self.__board
+        if not board.is_opened(index):
+            return []
+        neighbors = board.get_neighbors(index)
+        flags = sum(1 for neighbor in neighbors if board.is_flagged(neighbor))
+        if flags != board.get_value(index):
+            return []
+        if self.__logged:
+            self.__move_log.append(CHORD, index)
+
+        profiler = get_profiler()
+        start = profiler.start()
+        revealed = []
+        for neighbor in neighbors:
+            revealed += board.open_connected_zeros(neighbor)
+        profiler.record("chord", start, len(revealed))
+        return revealed
+
+    def open_on_press(self, row, col):
+        """
+        This is called when a field is opened manually. If the field has a
+        mine, the game is over. If the field has zero surrounding mines, all
+        the connected zeros and their surrounding fields are opened. If the
+        field is neither a mine or a zero, it is simply opened.
+
+        :param row: int, row index of the opened field
+        :param col: int, column index of the opened field
+        :return: bool, False if the opened field was a mine, True if not
+        """
+        self.apply_moves([(REVEAL, row, col)])
+        return not self.__board.is_lost()
+
+    def flag_field(self, row, col):
+        """
+        Flags the field, unless it has already been opened or the game is
+        over. The game is won as soon as every mine, and only the mines, are
+        flagged.
+
+        :param row: int, row index of the field
+        :param col: int, column index of the field
+        :return: bool, True if the field was flagged, False if not
+        """
+        return bool(self.apply_moves([(FLAG, row, col)])[0])
+
+    def chord(self, row, col):
+        """
+        Opens the closed fields around an opened field that has as many
+        flags around it as it has mines. A field that isn't ready to be
+        chorded is left as it is.
+
+        :param row: int, row index of the opened field
+        :param col: int, column index of the opened field
+        :return: list, the indices of the fields that were opened
+        """
+        return self.apply_moves([(CHORD, row, col)])[0]
 
     def open_all_fields(self):
         """
         Opens all fields in the grid. This is called when a game is over.
+
+        :return: list, the indices of the fields that were opened
+        """
+        profiler = get_profiler()
+        start = profiler.start()
+        opened = self.__board.open_all()
+        profiler.record("open all", start, len(opened))
+        if self.__ui is not None:
+            self.__ui.draw_fields(opened)
+        return opened
+
+    def check_if_win(self):
+        """
+        Checks if every mine is flagged and every flagged field has a mine.
+
+        :return: bool, True if the game is won, False if not
+        """
+        profiler = get_profiler()
+        start = profiler.start()
+        won = self.__board.is_won()
+        profiler.record("check win", start)
+        return won
+
+    def check(self):
+        """
+        Ends the game the way the Check button does: it is won if every mine,
+        and only the mines, are flagged, and lost if not.
+
+        :return: bool, True if the game was won, False if it was lost
+        """
+        if self.__result is None:
+            if self.__logged:
+                self.__move_log.append(CHECK, 0)
+            self.end_game(self.check_if_win())
+        return self.__result
+
+    def end_game(self, win):
+        """
+        Ends the game. The result is displayed on the user interface, or if
+        there is none, all fields are simply opened.
+
+        :param win: bool, True if won, False if lost
         """
-        for row in range(len(self.__grid)):
-            for col in range(len(self.__grid[row])):
-                self.__grid[row][col].open_field()
+        if self.__result is not None:
+            return
+        self.__result = win
+        history = self.__history
+        if history is not None and history.get_result()[0] is None:
+            #  The game was ended without a move, by checking it, so the
+            #  check is recorded as a move that changes no fields.
+            history.record(make_diff([], b"", b""), win, self.__started,
+                           final_state=bytes(self.__board.get_state()))
+        if self.__ui is not None:
+            self.__ui.game_over(win, self)
+        else:
+            self.open_all_fields()
+
+    def get_result(self):
+        """
+        :return: bool, True if the game was won, False if it was lost and None
+        if it is still on
+        """
+        return self.__result
 
     def reset(self):
         """
-        Resets the grid by destroying the tkinter objects of all fields and
-        making the grid into an epmty list again.
+        Resets the grid by stopping the current game. The board itself is kept
+        so that the next game of the same size can reuse it.
         """
-        for row in range(len(self.__grid)):
-            for col in range(len(self.__grid[row])):
-                self.__grid[row][col].delete_field()
+        self.__started = False
+        self.__result = None
+        self.__history = None
 
-        self.__grid = []
+    def get_history(self):
+        """
+        :return: History, the moves of the current game, or None if the board
+        doesn't keep a history
+        """
+        return self.__history
 
-    def get_grid(self):
+    def get_board(self):
         """
-        :return: list, the list structure in which the fields are stored
+        :return: Board, the headless state of the game
         """
-        return self.__grid
+        return self.__board
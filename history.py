@@ -0,0 +1,215 @@
+from array import array
+from itertools import compress
+
+#  The type code of the arrays that the indices of the changed fields are
+#  stored in. Four bytes per field is enough for any board held in memory.
+INDEX_TYPE = "I"
+
+
+def find_changes(before, after):
+    """
+    :param before: bytes, the state or the mines of the fields at one point
+    :param after: bytes, the same at another point
+    :return: list, the indices of the fields that differ
+    """
+    #  The fields are compared in one batch as big integers, and the bytes
+    #  of the differing fields are nonzero.
+    difference = (int.from_bytes(before, "little")
+                  ^ int.from_bytes(after, "little")).to_bytes(
+        len(before), "little")
+    return list(compress(range(len(difference)), difference))
+
+
+def make_diff(indices, before, after):
+    """
+    :param indices: list, the indices of the changed fields
+    :param before: bytes, the state of the fields before the moves
+    :param after: bytes, the state of the fields after the moves
+    :return: tuple, the diff of the moves as (indices, before, after), with
+    the states of the changed fields only
+    """
+    return (array(INDEX_TYPE, indices), bytes(before[i] for i in indices),
+            bytes(after[i] for i in indices))
+
+
+def compose(first, second):
+    """
+    :param first: tuple, a diff as (indices, before, after), where before
+    and after hold the states of the fields before and after the moves
+    :param second: tuple, the diff of the moves that follow
+    :return: tuple, the diff of both, leaving out the fields that end up as
+    they were
+    """
+    before = dict(zip(second[0], second[1]))
+    before.update(zip(first[0], first[1]))
+    after = dict(zip(first[0], first[2]))
+    after.update(zip(second[0], second[2]))
+    indices = [index for index, state in before.items()
+               if after[index] != state]
+    return make_diff(indices, before, after)
+
+
+class History:
+    """
+    The moves of a game as diffs of the open/flag state of the fields, so
+    that the memory in use grows with the number of fields changed and not
+    with the size of the board. A diff holds the indices of the fields that
+    a move changed and their states before and after it.
+
+    Besides the diff of every move, the diffs of 2, 4, 8, ... consecutive
+    moves starting at a multiple of their count are kept as checkpoints. Any
+    span of moves is covered by at most two such diffs of every size, so
+    moving to any point of the history applies O(log n) diffs, each no
+    larger than the changes between the two points.
+
+    The position is the number of moves made: 0 is the start of the game.
+    Undoing moves and then making a new one drops the moves that were
+    undone. Opening all of the fields at the end of the game isn't a diff of
+    its own: the state of the fields before it is kept instead, once.
+    """
+    def __init__(self, result=None, started=False):
+        """
+        :param result: bool, the result of the game at its start
+        :param started: bool, True if the first field has been opened
+        """
+        #  self.__levels[k][j] is the diff of the moves j * 2**k to
+        #  (j + 1) * 2**k - 1.
+        self.__levels = [[]]
+        #  The result of the game and whether it had started, at every
+        #  position.
+        self.__results = [(result, started)]
+        self.__position = 0
+        #  The position after the move that moved the mines away from the
+        #  first opened field, and the fields whose mines changed, as
+        #  (position, indices, mines before, mines after).
+        self.__mines = None
+        #  The state of the fields after the move that ended the game.
+        self.__final_state = None
+
+    def record(self, diff, result, started, mines=None, final_state=None):
+        """
+        Records a move at the current position, dropping the moves that
+        have been undone.
+
+        :param diff: tuple, the diff of the move, see compose()
+        :param result: bool, the result of the game after the move
+        :param started: bool, True if the first field has been opened
+        :param mines: tuple, the fields whose mines the move changed, as
+        (indices, mines before, mines after), or None if it changed none
+        :param final_state: bytes, the state of the fields after the move if
+        it ended the game, before all of them were opened
+        """
+        position = self.__position
+        for level, diffs in enumerate(self.__levels):
+            del diffs[position >> level:]
+        del self.__results[position + 1:]
+        if self.__mines is not None and self.__mines[0] > position:
+            self.__mines = None
+        self.__final_state = final_state
+
+        position += 1
+        self.__levels[0].append(diff)
+        self.__results.append((result, started))
+        if mines is not None:
+            self.__mines = (position, *mines)
+        self.__position = position
+
+        #  Every time the number of moves is a multiple of 2**k, the two
+        #  latest diffs of the level below are composed into a checkpoint.
+        level = 1
+        while position % (1 << level) == 0:
+            if level == len(self.__levels):
+                self.__levels.append([])
+            below = self.__levels[level - 1]
+            self.__levels[level].append(compose(below[-2], below[-1]))
+            level += 1
+
+    def seek(self, target):
+        """
+        Moves to another point of the history.
+
+        :param target: int, the position to move to
+        :return: list, the (indices, states) of the fields to set, in order
+        """
+        position = self.__position
+        length = len(self.__results) - 1
+        if not 0 <= target <= length:
+            raise IndexError("no such position in the history")
+        levels = self.__levels
+
+        changes = []
+        while position < target:
+            level = self.__largest_step(position, target - position)
+            changes.append((levels[level][position >> level][0],
+                            levels[level][position >> level][2]))
+            position += 1 << level
+        while position > target:
+            level = self.__largest_step(position, position - target)
+            diff = levels[level][(position >> level) - 1]
+            changes.append((diff[0], diff[1]))
+            position -= 1 << level
+        self.__position = target
+        return changes
+
+    def __largest_step(self, position, distance):
+        """
+        :param position: int, the current position
+        :param distance: int, how far the target is
+        :return: int, the level of the largest checkpoint that starts or ends
+        at the position and doesn't go past the target
+        """
+        level = 0
+        while level + 1 < len(self.__levels) \
+                and position % (2 << level) == 0 \
+                and 2 << level <= distance:
+            level += 1
+        return level
+
+    def crosses_mines(self, start, end):
+        """
+        :param start: int, a position
+        :param end: int, another position
+        :return: tuple, the fields whose mines change between the positions,
+        as (indices, mines at the end), or None if no mines change
+        """
+        if self.__mines is None:
+            return None
+        position, indices, before, after = self.__mines
+        if start < position <= end:
+            return indices, after
+        if end < position <= start:
+            return indices, before
+        return None
+
+    def get_final_state(self):
+        """
+        :return: bytes, the state of the fields after the move that ended the
+        game, before all of them were opened, or None if the game isn't over
+        """
+        return self.__final_state
+
+    def get_result(self):
+        """
+        :return: (bool, bool), the result of the game at the current position
+        and whether it had started
+        """
+        return self.__results[self.__position]
+
+    def get_position(self):
+        """
+        :return: int, the number of moves made up to the current position
+        """
+        return self.__position
+
+    def get_length(self):
+        """
+        :return: int, the number of moves in the history
+        """
+        return len(self.__results) - 1
+
+    def get_size(self):
+        """
+        :return: int, the number of field changes stored, checkpoints
+        included
+        """
+        return sum(len(diff[0]) for diffs in self.__levels for diff in diffs)
@@ -0,0 +1,251 @@
+"""
+Load test of the game server. Every client opens a connection of its own,
+starts a number of games and plays random moves on them, one request at a
+time, and a game that ends is replaced with a new one. The number of moves
+per second over all clients and the latencies of the requests are reported.
+
+The server can be started by the load test itself with --spawn.
+
+Usage: python loadtest.py [--host HOST] [--port PORT] [--unix PATH]
+                          [--clients N] [--sessions N] [--moves N]
+                          [--height N] [--width N] [--difficulty N]
+                          [--seed N] [--spawn]
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+DEFAULT_CLIENTS = 50
+DEFAULT_SESSIONS = 20
+DEFAULT_MOVES = 200
+
+#  The shares of flags and chords among the moves, the rest are reveals.
+FLAG_SHARE = 0.1
+CHORD_SHARE = 0.1
+
+#  How long to wait for a spawned server to start listening, in seconds.
+SPAWN_TIMEOUT = 10
+
+
+class Client:
+    """
+    A client of the server playing a set of games over one connection.
+    """
+    def __init__(self, reader, writer, settings, seed):
+        """
+        :param reader: StreamReader, the stream that the responses come from
+        :param writer: StreamWriter, the stream that the requests go to
+        :param settings: dict, the keys of the "new" requests
+        :param seed: int, the seed of the random moves
+        """
+        self.__reader = reader
+        self.__writer = writer
+        self.__settings = settings
+        self.__random = random.Random(seed)
+        #  The fields still closed and the opened fields with a number, by
+        #  session.
+        self.__closed = {}
+        self.__numbers = {}
+        self.__latencies = []
+        self.__games = 0
+
+    async def request(self, request):
+        """
+        Sends a request and waits for the response.
+
+        :param request: dict, the request
+        :return: dict, the response
+        """
+        start = time.perf_counter()
+        self.__writer.write(json.dumps(request).encode() + b"\n")
+        await self.__writer.drain()
+        response = json.loads(await self.__reader.readline())
+        self.__latencies.append(time.perf_counter() - start)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def new_game(self):
+        """
+        :return: int, the session of a new game
+        """
+        response = await self.request({"cmd": "new", **self.__settings})
+        session = response["session"]
+        self.__closed[session] = set(
+            range(response["height"] * response["width"]))
+        self.__numbers[session] = set()
+        self.__games += 1
+        return session
+
+    async def play(self, sessions, moves):
+        """
+        Plays random moves on the games until the given number of moves has
+        been made.
+
+        :param sessions: int, number of games played at once
+        :param moves: int, number of moves to make
+        """
+        width = self.__settings["width"]
+        games = [await self.new_game() for _ in range(sessions)]
+        for _ in range(moves):
+            slot = self.__random.randrange(len(games))
+            session = games[slot]
+            closed = self.__closed[session]
+            numbers = self.__numbers[session]
+
+            share = self.__random.random()
+            if share < CHORD_SHARE and numbers:
+                command = "chord"
+                index = self.__random.choice(tuple(numbers))
+            else:
+                command = "flag" if share < CHORD_SHARE + FLAG_SHARE \
+                    else "reveal"
+                index = self.__random.choice(tuple(closed))
+            response = await self.request(
+                {"cmd": command, "session": session,
+                 "row": index // width, "col": index % width})
+
+            for index, value in response["opened"]:
+                closed.discard(index)
+                if 0 < value < 9:
+                    numbers.add(index)
+            closed.difference_update(response["flagged"])
+            if response["result"] is not None or not closed:
+                await self.request({"cmd": "close", "session": session})
+                del self.__closed[session], self.__numbers[session]
+                games[slot] = await self.new_game()
+
+    def get_latencies(self):
+        """
+        :return: list, the latencies of the requests in seconds
+        """
+        return self.__latencies
+
+    def get_games(self):
+        """
+        :return: int, number of games started
+        """
+        return self.__games
+
+
+async def run_client(args, number):
+    """
+    :param args: Namespace, the arguments of the load test
+    :param number: int, the number of the client
+    :return: Client, the client after it has made its moves
+    """
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    settings = {"height": args.height, "width": args.width,
+                "difficulty": args.difficulty}
+    client = Client(reader, writer, settings, f"{args.seed}:{number}")
+    try:
+        await client.play(args.sessions, args.moves)
+    finally:
+        writer.close()
+    return client
+
+
+async def run(args):
+    """
+    :param args: Namespace, the arguments of the load test
+    :return: (list, float), the clients and the time they took in seconds
+    """
+    start = time.perf_counter()
+    clients = await asyncio.gather(*(run_client(args, number)
+                                     for number in range(args.clients)))
+    return clients, time.perf_counter() - start
+
+
+def spawn_server(args):
+    """
+    Starts the server in a process of its own and waits until it accepts
+    connections.
+
+    :param args: Namespace, the arguments of the load test
+    :return: Popen, the server process
+    """
+    command = [sys.executable, "server.py"]
+    if args.unix:
+        command += ["--unix", args.unix]
+    else:
+        command += ["--host", args.host, "--port", str(args.port)]
+    process = subprocess.Popen(command)
+
+    deadline = time.monotonic() + SPAWN_TIMEOUT
+    while True:
+        try:
+            if args.unix:
+                connection = socket.socket(socket.AF_UNIX)
+                connection.connect(args.unix)
+            else:
+                connection = socket.create_connection((args.host, args.port))
+            connection.close()
+            return process
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                raise
+            time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Plays random games on the game server from many "
+                    "clients at once.")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="address of the server")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="port of the server")
+    parser.add_argument("--unix", help="path of the Unix socket of the "
+                                       "server instead")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS,
+                        help="number of connections")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS,
+                        help="number of games played at once by a client")
+    parser.add_argument("--moves", type=int, default=DEFAULT_MOVES,
+                        help="number of moves made by a client")
+    parser.add_argument("--height", type=int, default=16,
+                        help="number of rows on the boards")
+    parser.add_argument("--width", type=int, default=30,
+                        help="number of columns on the boards")
+    parser.add_argument("--difficulty", type=int, default=15,
+                        help="the percentage of fields that have a mine")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random moves")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start the server for the test")
+    args = parser.parse_args()
+
+    process = spawn_server(args) if args.spawn else None
+    try:
+        clients, elapsed = asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    latencies = sorted(latency for client in clients
+                       for latency in client.get_latencies())
+    moves = args.clients * args.moves
+    games = sum(client.get_games() for client in clients)
+    print(f"{args.clients} clients, {games} games, {moves} moves, "
+          f"{len(latencies)} requests in {elapsed:.2f} s")
+    print(f"{moves / elapsed:.0f} moves/s, {len(latencies) / elapsed:.0f} "
+          f"requests/s")
+    print(f"latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, "
+          f"max {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,8 @@ The goal is to flag all the mines. The game ends when you either hit a mine, or
 press the Check-button. Pressing the Check-button makes the program check if
 all mines are flagged. This is where the program works a little different than
 some other minesweepers. It doesn't care whether all fields are opened. You
-just need to flag every mine (and only the mines). Once the game is over, the
+just need to flag every mine (and only the mines). The game also ends by
+itself as soon as the last mine is flagged. Once the game is over, the
 program displays either "Game over" should you lose or "You win!" if you have
 won.
 
@@ -29,15 +30,53 @@ grid. Once you have chosen the desired grid size and difficulty, you still need
 to press the Restart-button for those changes to come into effect. Note that
 the "Very Easy" -difficulty is meant for testing of the game mechanics and
 doesn't pose a real challenge.
+
+If "No guessing" is checked, the games can be solved by logic alone. Such
+a game starts with the field in the middle of the grid already opened. The
+boards are looked for in the background, so a new game can usually start
+right away. If no such board has been found yet, for example right after
+the box is checked, an ordinary board is played instead, and the bar that shows the result
+of the game says that it may need a guess.
+
+The "Endless" size is a board of a million by a million fields that is only
+generated where it is explored: as the zeros open up or the grid is scrolled.
+An endless game can't be won, so the goal is to get as far as possible without
+hitting a mine. Its first opened field is always safe.
+
+Starting the program with the --profile option shows how long opening,
+flagging and drawing the fields take below the grid. The recorded events can
+be saved to a trace file with the Save trace -button.
+
+The Save-button saves the game to minesweeper-save.bin and the Load-button
+continues the game saved there. Starting the program with the --record option
+appends the moves of every game to minesweeper-moves.log, which replay.py
+can replay and summarize. The --size option, e.g. --size 1000x1000, starts
+with a grid of any size instead of the one chosen from the menu.
+
+The Undo-button (Ctrl+Z) takes back moves one at a time, a lost or won game
+included, and the Redo-button (Ctrl+Y) makes them again. Endless games have
+no undo.
 """
+import sys
+
+import profiler
 from gamegrid import GameGrid
+from savefile import MoveLog
 from ui import UI
 
 
 def main():
+    if "--profile" in sys.argv[1:]:
+        profiler.enable()
     grid_object = GameGrid()
+    if "--record" in sys.argv[1:]:
+        grid_object.set_move_log(MoveLog())
     ui = UI(grid_object)
+    if "--size" in sys.argv[1:-1]:
+        ui.set_size(sys.argv[sys.argv.index("--size") + 1])
+    ui.show()
     ui.new_game(grid_object)
+    ui.start()
 
 
 if __name__ == "__main__":
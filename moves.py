@@ -0,0 +1,14 @@
+"""
+The kinds of moves of a game. A batch of moves is made with
+GameGrid.apply_moves(), and the moves are written to the move log as they
+are made, so the values are also the kinds of the records of the log, next
+to savefile.GAME, and mustn't change.
+"""
+
+#  Opening a field, flagging it, and opening the fields around an opened
+#  field whose mines are all flagged.
+REVEAL = 1
+FLAG = 2
+CHORD = 3
+#  The Check button, which ends the game.
+CHECK = 4
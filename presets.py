@@ -0,0 +1,16 @@
+"""
+The sizes and difficulties that games are played at. They are kept apart
+from the user interface, so that the headless tools can use them without
+importing tkinter.
+"""
+
+#  The percentage of fields that have a mine at each difficulty.
+VERY_EASY = 1
+EASY = 10
+NORMAL = 15
+HARD = 22
+
+#  The sizes and difficulties that can be chosen from the menus.
+SIZES = ["10x10", "15x15", "20x20", "20x40", "200x200"]
+DIFFICULTIES = {"Very Easy": VERY_EASY, "Easy": EASY, "Normal": NORMAL,
+                "Hard": HARD}
@@ -0,0 +1,429 @@
+from math import comb
+
+from board import OPENED, CLOSED, FLAGGED
+
+#  The largest number of states after a group of fields, and of steps from
+#  one state to the next in all, that the layouts of a component are counted
+#  with. A player's frontier takes a few hundred steps at most, but a tangled
+#  one could take too long to count exactly.
+MAX_STATES = 200
+MAX_STEPS = 2000
+
+
+class _TooManySteps(Exception):
+    """
+    Raised when counting the layouts of a component takes too many steps.
+    """
+    def __init__(self, constraints):
+        """
+        :param constraints: list, the partly done constraints at that point
+        """
+        super().__init__()
+        self.constraints = constraints
+
+
+class MineProbabilities:
+    """
+    Calculates the exact probability of every closed field having a mine,
+    given what a player can see: the opened fields, their numbers, the flags
+    and the number of mines on the board. Flagged fields are taken to be
+    mines.
+
+    The closed fields next to opened numbers form the frontier. The frontier
+    is split into components that don't share any constraints, and the
+    layouts of each component are counted separately for every number of
+    mines it can hold. The components are then combined with the rest of the
+    closed fields, where the remaining mines can be anywhere, using the
+    number of mines left on the board.
+
+    The layouts of a component are counted by going through its fields in
+    order and keeping only the still unmet numbers of the constraints that
+    are partly done, so a long but narrow frontier is counted in linear time
+    instead of by trying every layout. Fields that belong to the same
+    constraints are counted together as a group.
+
+    The counts of a component are kept for as long as the component stays
+    the same, so after a move only the components that it changed are
+    counted again.
+    """
+    def __init__(self, board):
+        """
+        :param board: Board, the board to calculate the probabilities for
+        """
+        self.__board = board
+        self.__values = board.get_values()
+        self.__state = board.get_state()
+        self.__starts, self.__neighbors = board.get_neighbor_table()
+
+        #  The counts of the components found by the last calculation, by the
+        #  constraints of the component.
+        self.__components = {}
+        self.__exact = True
+
+    def calculate(self):
+        """
+        :return: dict, the probability of a mine (0.0-1.0) for every closed
+        unflagged field by its index, or None if no layout of the mines fits
+        what can be seen on the board
+        """
+        state = self.__state
+        closed = []
+        index = state.find(CLOSED)
+        while index != -1:
+            closed.append(index)
+            index = state.find(CLOSED, index + 1)
+        mines_left = self.__board.get_number_of_mines() - state.count(FLAGGED)
+
+        components = {}
+        counted = []
+        self.__exact = True
+        for component in self.__split(self.__find_constraints()):
+            signature = tuple(sorted(component))
+            pieces, exact = components[signature] = \
+                self.__components.get(signature) or self.__count(signature)
+            counted.extend(pieces)
+            self.__exact = self.__exact and exact
+        self.__components = components
+
+        frontier = set()
+        for groups, _, _ in counted:
+            for fields in groups:
+                frontier.update(fields)
+        others = len(closed) - len(frontier)
+
+        #  The number of ways to place the mines that the frontier doesn't
+        #  have on the other closed fields, by the number of frontier mines.
+        ways = [comb(others, mines_left - mines)
+                for mines in range(mines_left + 1)]
+
+        total = [1]
+        for _, layouts, _ in counted:
+            total = _convolve(total, layouts)
+        all_layouts = sum(count * ways[mines]
+                          for mines, count in enumerate(total)
+                          if mines <= mines_left)
+        if all_layouts == 0:
+            return None
+
+        probabilities = {}
+        for groups, layouts, group_layouts in counted:
+            #  The layouts of the other components and the closed fields
+            #  outside the frontier, by the number of mines in this one.
+            rest = _divide(total, layouts)
+            outside = [sum(count * ways[mines + own]
+                           for mines, count in enumerate(rest)
+                           if mines + own <= mines_left)
+                       for own in range(len(layouts))]
+            for fields, mine_layouts in zip(groups, group_layouts):
+                probability = sum(
+                    count * outside[own]
+                    for own, count in enumerate(mine_layouts)) / all_layouts
+                for field in fields:
+                    probabilities[field] = probability
+
+        if others:
+            outside_mines = sum(count * ways[mines] * (mines_left - mines)
+                                for mines, count in enumerate(total)
+                                if mines <= mines_left)
+            probability = outside_mines / (others * all_layouts)
+            for field in closed:
+                if field not in frontier:
+                    probabilities[field] = probability
+        return probabilities
+
+    def is_exact(self):
+        """
+        :return: bool, True if the last calculated probabilities are exact,
+        False if some constraints had to be left out to count them in time
+        """
+        return self.__exact
+
+    def __count(self, constraints):
+        """
+        Counts the layouts of a component. If that would take too many steps,
+        the constraints that make it too tangled are left out and the rest of
+        it is split and counted again, so the probabilities of its fields are
+        only approximate.
+
+        :param constraints: tuple, the (fields, mines) pairs of the component
+        :return: (list, bool), the counts of the parts that the component was
+        counted in, see _count_layouts(), and True if they are exact
+        """
+        try:
+            return [_count_layouts(constraints)], True
+        except _TooManySteps as error:
+            left_out = set(error.constraints)
+        counted = []
+        for component in self.__split([constraint
+                                       for constraint in constraints
+                                       if constraint not in left_out]):
+            counted.extend(self.__count(tuple(sorted(component)))[0])
+        return counted, False
+
+    def __find_constraints(self):
+        """
+        :return: list, a (fields, mines) pair for every opened number next to
+        closed fields, where fields is a tuple of the closed unflagged fields
+        around it and mines the number of them that have a mine
+        """
+        state = self.__state
+        values = self.__values
+        starts = self.__starts
+        neighbors = self.__neighbors
+
+        constraints = []
+        index = state.find(OPENED)
+        while index != -1:
+            if values[index]:
+                around = neighbors[starts[index]:starts[index + 1]]
+                fields = tuple(field for field in around
+                               if state[field] == CLOSED)
+                if fields:
+                    flags = sum(1 for field in around
+                                if state[field] == FLAGGED)
+                    constraints.append((fields, values[index] - flags))
+            index = state.find(OPENED, index + 1)
+        return constraints
+
+    def __split(self, constraints):
+        """
+        Splits the constraints into components that don't share fields.
+
+        :param constraints: list, (fields, mines) pairs
+        :return: list, the constraints of every component
+        """
+        by_field = {}
+        for number, (fields, _) in enumerate(constraints):
+            for field in fields:
+                by_field.setdefault(field, []).append(number)
+
+        components = []
+        seen = set()
+        for number in range(len(constraints)):
+            if number in seen:
+                continue
+            seen.add(number)
+            stack = [number]
+            component = []
+            while stack:
+                current = stack.pop()
+                component.append(constraints[current])
+                for field in constraints[current][0]:
+                    for other in by_field[field]:
+                        if other not in seen:
+                            seen.add(other)
+                            stack.append(other)
+            components.append(component)
+        return components
+
+
+def _count_layouts(constraints):
+    """
+    Counts the layouts of mines that meet all constraints of a component.
+
+    The groups of fields are gone through in order, first forwards and then
+    backwards. A state is the tuple of unmet mines of the constraints that
+    have fields on both sides of the current group. The forward pass counts
+    the layouts of the groups before each state and the backward pass the
+    layouts of the groups after it, and the layouts with a mine on a field
+    of a group are the two joined over every way to fill the group.
+
+    :param constraints: tuple, the (fields, mines) pairs of the component
+    :return: (list, list, list), the fields of every group, the number of
+    layouts by the number of mines, and for every group the number of layouts
+    with a mine on one of its fields by the number of mines
+    """
+    memberships = {}
+    for number, (fields, _) in enumerate(constraints):
+        for field in fields:
+            memberships.setdefault(field, []).append(number)
+    by_membership = {}
+    for field in sorted(memberships):
+        by_membership.setdefault(tuple(memberships[field]), []).append(field)
+    groups = _order_groups(list(by_membership.items()))
+
+    #  The position of the last group of every constraint, and the active
+    #  constraints after every group.
+    last = {}
+    for position, (membership, _) in enumerate(groups):
+        for number in membership:
+            last[number] = position
+    active = []
+    current = []
+    for position, (membership, _) in enumerate(groups):
+        current = [number for number in current if last[number] > position]
+        current += [number for number in membership
+                    if last[number] > position and number not in current]
+        active.append(current)
+
+    #  The counts of layouts by the number of mines are packed into big
+    #  integers with a fixed number of bytes for each count, so that they
+    #  are added and convolved with single integer operations. A count can't
+    #  be larger than the number of subsets of the fields of the component.
+    width = len(memberships) // 8 + 1
+    bits = 8 * width
+
+    #  The forward pass. The transitions of every group are kept for the
+    #  backward pass.
+    forward = [{(): 1}]
+    transitions = []
+    total_steps = 0
+    before = []
+    for position, (membership, fields) in enumerate(groups):
+        after = active[position]
+        size = len(fields)
+        #  Where the unmet mines of the constraints of the group come from:
+        #  the state, or the constraint itself if it starts here. The new
+        #  state is picked from the old state followed by the constraints of
+        #  the group.
+        sources = [(before.index(number) if number in before else -1,
+                    constraints[number][1], last[number] == position)
+                   for number in membership]
+        picks = [len(before) + membership.index(number)
+                 if number in membership else before.index(number)
+                 for number in after]
+        steps = []
+        states = {}
+        for state, layouts in forward[-1].items():
+            for mines in range(size + 1):
+                needed = []
+                for source, full, ends in sources:
+                    left = (state[source] if source >= 0 else full) - mines
+                    if left < 0 or left and ends:
+                        break
+                    needed.append(left)
+                else:
+                    combined = state + tuple(needed)
+                    new_state = tuple(map(combined.__getitem__, picks))
+                    steps.append((state, mines, new_state))
+                    states[new_state] = states.get(new_state, 0) \
+                        + (layouts * comb(size, mines) << bits * mines)
+                    continue
+                if left < 0:
+                    #  More mines would only be more over the number.
+                    break
+        forward.append(states)
+        transitions.append(steps)
+        total_steps += len(steps)
+        if len(states) > MAX_STATES or total_steps > MAX_STEPS:
+            raise _TooManySteps([constraints[number]
+                                 for number in after or membership])
+        before = after
+
+    #  The backward pass, and the layouts with a mine on a field of each
+    #  group.
+    backward = {(): 1}
+    group_layouts = [None] * len(groups)
+    for position in range(len(groups) - 1, -1, -1):
+        size = len(groups[position][1])
+        states = {}
+        mine_layouts = 0
+        for state, mines, new_state in transitions[position]:
+            after = backward.get(new_state)
+            if after is None:
+                continue
+            states[state] = states.get(state, 0) \
+                + (after * comb(size, mines) << bits * mines)
+            if mines:
+                mine_layouts += forward[position][state] * after \
+                    * comb(size - 1, mines - 1) << bits * mines
+        group_layouts[position] = _unpack(mine_layouts, width)
+        backward = states
+
+    return [fields for _, fields in groups], \
+        _unpack(backward.get((), 0), width), group_layouts
+
+
+def _order_groups(groups):
+    """
+    Orders the groups so that few constraints are partly done at any point,
+    which keeps the number of states small. The next group is always the one
+    that starts the fewest new constraints and finishes the most.
+
+    :param groups: list, the (constraints, fields) pair of every group
+    :return: list, the groups in order
+    """
+    remaining = {}
+    by_constraint = {}
+    for position, (membership, _) in enumerate(groups):
+        for number in membership:
+            remaining[number] = remaining.get(number, 0) + 1
+            by_constraint.setdefault(number, []).append(position)
+
+    ordered = []
+    left = set(range(len(groups)))
+    started = set()
+    candidates = set()
+
+    def growth(position):
+        """
+        :param position: int, the position of a group in groups
+        :return: (int, int), the change in the number of partly done
+        constraints if the group was next, and the position to break ties
+        """
+        membership = groups[position][0]
+        new = sum(1 for number in membership
+                  if number not in started and remaining[number] > 1)
+        done = sum(1 for number in membership if remaining[number] == 1)
+        return new - done, position
+
+    while left:
+        if not candidates:
+            candidates.add(min(left))
+        position = min(candidates, key=growth)
+        candidates.discard(position)
+        left.discard(position)
+        ordered.append(groups[position])
+        for number in groups[position][0]:
+            remaining[number] -= 1
+            started.add(number)
+            if remaining[number]:
+                candidates.update(other for other in by_constraint[number]
+                                  if other in left)
+            else:
+                started.discard(number)
+    return ordered
+
+
+def _unpack(packed, width):
+    """
+    :param packed: int, counts packed into an integer, width bytes each
+    :param width: int, the number of bytes of a count
+    :return: list, the counts, without trailing zeros
+    """
+    data = packed.to_bytes((packed.bit_length() + 7) // 8 or 1, "little")
+    return [int.from_bytes(data[start:start + width], "little")
+            for start in range(0, len(data), width)]
+
+
+def _convolve(first, second):
+    """
+    :param first: list, counts by the number of mines
+    :param second: list, counts by the number of mines
+    :return: list, the counts of both together by the total number of mines
+    """
+    result = [0] * (len(first) + len(second) - 1)
+    for mines, count in enumerate(first):
+        if count:
+            for other, other_count in enumerate(second, mines):
+                result[other] += count * other_count
+    return result
+
+
+def _divide(total, counts):
+    """
+    Divides counts out of a convolution they are part of.
+
+    :param total: list, counts by the number of mines
+    :param counts: list, counts by the number of mines that total is a
+    convolution of
+    :return: list, the counts that convolved with counts give total
+    """
+    lowest = next(mines for mines, count in enumerate(counts) if count)
+    result = [0] * (len(total) - len(counts) + 1)
+    for mines in range(len(result)):
+        remainder = total[mines + lowest] - sum(
+            counts[lowest + step] * result[mines - step]
+            for step in range(1, min(mines, len(counts) - 1 - lowest) + 1))
+        result[mines] = remainder // counts[lowest]
+    return result
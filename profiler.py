@@ -0,0 +1,172 @@
+import json
+import time
+from collections import deque
+
+#  How many events are kept. The oldest events are dropped first.
+DEFAULT_CAPACITY = 10000
+
+#  The name of the file that the trace is exported to.
+TRACE_FILE = "minesweeper-trace.json"
+
+
+class Profiler:
+    """
+    Records how long the hot paths of the game take. Every event is a
+    (name, start, duration, count) tuple kept in a ring buffer of a fixed
+    size, so recording never grows the memory in use. The count goes with the
+    name: the number of fields opened by a flood fill or the number of canvas
+    calls made by a redraw, for example.
+
+    A user action, such as a click, is timed from the moment it is handled
+    until the redraw that follows it has been done, and the canvas calls made
+    in between are counted, so a slow click can be told apart into the time
+    spent on the board and the time spent on Tk.
+
+    A disabled profiler records nothing and its methods return right away,
+    so the game can always be instrumented.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=True):
+        """
+        :param capacity: int, how many events are kept
+        :param enabled: bool, False if nothing should be recorded
+        """
+        self.__enabled = enabled
+        self.__events = deque(maxlen=capacity)
+        #  The number of events, their total and longest duration by name,
+        #  over all events and not only the kept ones.
+        self.__totals = {}
+        self.__created = time.perf_counter()
+
+        #  The name and start of the user action waiting for its redraw, and
+        #  the Tk calls made since it started.
+        self.__action = None
+        self.__tk_calls = 0
+        self.__last_action = None
+
+    def is_enabled(self):
+        """
+        :return: bool, True if events are recorded, False if not
+        """
+        return self.__enabled
+
+    def start(self):
+        """
+        :return: float, the start time of an event, to be given to record()
+        """
+        if not self.__enabled:
+            return 0.0
+        return time.perf_counter()
+
+    def record(self, name, start, count=0):
+        """
+        Records an event that ends now.
+
+        :param name: str, the name of the event
+        :param start: float, the start time given by start()
+        :param count: int, the number that goes with the event
+        """
+        if not self.__enabled:
+            return
+        duration = time.perf_counter() - start
+        self.__events.append((name, start, duration, count))
+        totals = self.__totals.get(name)
+        if totals is None:
+            self.__totals[name] = [1, duration, duration]
+        else:
+            totals[0] += 1
+            totals[1] += duration
+            if duration > totals[2]:
+                totals[2] = duration
+
+    def start_action(self, name):
+        """
+        Starts timing a user action. An action that is still waiting for its
+        redraw is replaced.
+
+        :param name: str, the name of the action, e.g. "open" or "flag"
+        """
+        if not self.__enabled:
+            return
+        self.__action = (name, time.perf_counter())
+        self.__tk_calls = 0
+
+    def count_tk_calls(self, calls):
+        """
+        :param calls: int, number of Tk calls made for the current action
+        """
+        if self.__enabled:
+            self.__tk_calls += calls
+
+    def end_action(self):
+        """
+        Ends the user action, if one is waiting, once its changes have been
+        drawn. The action is recorded as "action: name", with the Tk calls
+        made as its count.
+        """
+        if self.__action is None:
+            return
+        name, start = self.__action
+        self.__action = None
+        self.record(f"action: {name}", start, self.__tk_calls)
+        self.__last_action = self.__events[-1]
+
+    def get_events(self):
+        """
+        :return: list, the kept events as (name, start, duration, count)
+        tuples, oldest first
+        """
+        return list(self.__events)
+
+    def get_last_action(self):
+        """
+        :return: tuple, the event of the last ended user action, or None
+        """
+        return self.__last_action
+
+    def get_summary(self):
+        """
+        :return: dict, (number of events, total duration, longest duration)
+        by the name of the event
+        """
+        return {name: tuple(totals) for name, totals in self.__totals.items()}
+
+    def export(self, path=TRACE_FILE):
+        """
+        Writes the kept events to a file in the trace event format, which
+        can be opened in a trace viewer such as chrome://tracing or Perfetto.
+
+        :param path: str, the path of the file
+        """
+        events = [{"name": name, "ph": "X", "pid": 0,
+                   "tid": 1 if name.startswith("action: ") else 0,
+                   "ts": (start - self.__created) * 1e6,
+                   "dur": duration * 1e6, "args": {"count": count}}
+                  for name, start, duration, count in self.__events]
+        with open(path, "w") as trace:
+            json.dump({"traceEvents": events,
+                       "displayTimeUnit": "ms"}, trace)
+
+
+#  The profiler that the game records to. Profiling is off until enable() is
+#  called.
+_profiler = Profiler(0, enabled=False)
+
+
+def enable(capacity=DEFAULT_CAPACITY):
+    """
+    Turns profiling on with an empty ring buffer.
+
+    :param capacity: int, how many events are kept
+    :return: Profiler, the profiler that the game records to
+    """
+    global _profiler
+    _profiler = Profiler(capacity)
+    return _profiler
+
+
+def get_profiler():
+    """
+    :return: Profiler, the profiler that the game records to, disabled if
+    profiling is off
+    """
+    return _profiler
@@ -0,0 +1,127 @@
+"""
+Replays the games of a move log headless and summarizes them. The log is
+streamed through a memory map, so logs of any size can be replayed with a
+constant amount of memory: every game is played on a board of its own,
+generated from the seed and the settings logged at its start.
+
+Usage: python replay.py [LOG] [--games]
+"""
+import argparse
+import time
+
+from gamegrid import GameGrid
+from moves import REVEAL, FLAG, CHORD, CHECK
+from savefile import LOG_FILE, GAME, read_log
+
+
+class Replay:
+    """
+    A game being replayed, with the times of its first and last move.
+    """
+    def __init__(self, settings):
+        """
+        :param settings: dict, the settings of the game, see
+        savefile.unpack_settings()
+        """
+        self.__grid_object = GameGrid()
+        self.__grid_object.generate_fields(
+            settings["height"], settings["width"], settings["difficulty"],
+            seed=settings["seed"],
+            first_click_safe=settings["first_click_safe"],
+            topology=settings["topology"], endless=settings["endless"])
+        self.__moves = 0
+        self.__first = None
+        self.__last = None
+
+    def play(self, move, index, moment):
+        """
+        :param move: int, REVEAL, FLAG, CHORD or CHECK
+        :param index: int, index of the field, or 0 for CHECK
+        :param moment: int, the time of the move in microseconds
+        """
+        grid_object = self.__grid_object
+        field = grid_object.get_board().get_row_col(index)
+        if move == REVEAL:
+            grid_object.open_on_press(*field)
+        elif move == FLAG:
+            grid_object.flag_field(*field)
+        elif move == CHORD:
+            grid_object.chord(*field)
+        elif move == CHECK:
+            grid_object.check()
+        self.__moves += 1
+        if self.__first is None:
+            self.__first = moment
+        self.__last = moment
+
+    def get_moves(self):
+        """
+        :return: int, number of moves replayed
+        """
+        return self.__moves
+
+    def get_duration(self):
+        """
+        :return: float, the time from the first move to the last in seconds
+        """
+        if self.__first is None:
+            return 0.0
+        return (self.__last - self.__first) / 1e6
+
+    def get_result(self):
+        """
+        :return: bool, True if the game was won, False if it was lost and None
+        if it was left unfinished
+        """
+        return self.__grid_object.get_result()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replays the games of a move log.")
+    parser.add_argument("log", nargs="?", default=LOG_FILE,
+                        help="the move log to replay")
+    parser.add_argument("--games", action="store_true",
+                        help="print a line for every game")
+    args = parser.parse_args()
+
+    results = {True: 0, False: 0, None: 0}
+    games = 0
+    moves = 0
+    duration = 0.0
+
+    def finish(replay):
+        nonlocal games, moves, duration
+        games += 1
+        moves += replay.get_moves()
+        duration += replay.get_duration()
+        results[replay.get_result()] += 1
+        if args.games:
+            result = {True: "won", False: "lost", None: "unfinished"}[
+                replay.get_result()]
+            print(f"game {games}: {replay.get_moves()} moves, "
+                  f"{replay.get_duration():.1f} s, {result}")
+
+    start = time.perf_counter()
+    replay = None
+    for move, index, moment, settings in read_log(args.log):
+        if move == GAME:
+            if replay is not None:
+                finish(replay)
+            replay = Replay(settings)
+        elif replay is not None:
+            replay.play(move, index, moment)
+    if replay is not None:
+        finish(replay)
+    elapsed = time.perf_counter() - start
+
+    print(f"{games} games, {moves} moves replayed in {elapsed:.2f} s")
+    print(f"won {results[True]}, lost {results[False]}, "
+          f"unfinished {results[None]}")
+    if games:
+        print(f"{moves / games:.1f} moves and {duration / games:.1f} s "
+              f"played per game")
+
+
+if __name__ == "__main__":
+    main()
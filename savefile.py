@@ -0,0 +1,296 @@
+"""
+Saving games and logging moves in compact binary formats.
+
+A save file holds one game: a header with the settings and the seed of the
+board, the mine layout with one bit per field and the open/flag state of the
+fields with two bits per field. A 1000x1000 board takes about 370 kB.
+
+A move log is an append-only file of fixed-size records, one for every
+reveal, flag, chord and check, with the time it was made. Every game in the log
+starts with a game record followed by the settings of the game, so one log
+can hold any number of games. A log is read through a memory map, a record
+at a time, so logs much larger than the memory can be streamed.
+"""
+import mmap
+import struct
+import time
+
+from board import Board, MINE, FLAGGED
+from chunkedboard import ChunkedBoard
+from moves import REVEAL, FLAG, CHORD, CHECK
+from topology import TOPOLOGIES
+
+#  The file names that the game is saved to and the moves are logged to.
+SAVE_FILE = "minesweeper-save.bin"
+LOG_FILE = "minesweeper-moves.log"
+
+SAVE_MAGIC = b"MSWS"
+LOG_MAGIC = b"MSWL"
+VERSION = 1
+
+#  The header of a save file and the settings of a game in a log: the
+#  topology as its index in TOPOLOGIES, the height, the width, the
+#  difficulty, the flags below and the seed.
+SETTINGS = struct.Struct("<BIIBBQ")
+#  The beginning of both files: the magic bytes and the version.
+FILE_HEADER = struct.Struct("<4sB")
+#  A record of the move log: the move, the index of the field (or the seed of
+#  a new game) and the time in microseconds since the epoch.
+RECORD = struct.Struct("<BQq")
+
+#  The flags of the settings.
+FIRST_CLICK_SAFE = 1
+STARTED = 2
+ENDLESS = 4
+#  The result of a game that was over when it was saved. It can't be told
+#  from the fields, as all of them are opened at the end of a game, and a
+#  game lost by checking it has no opened mine.
+WON = 8
+LOST = 16
+
+#  The kinds of records in a move log: the start of a game, and the moves
+#  REVEAL, FLAG, CHORD and CHECK. The index of a CHECK record is 0.
+GAME = 0
+
+#  Translation tables from the fields to binary and base 4 digits, so that
+#  the fields can be packed with int(), and from the digits back.
+MINE_DIGITS = bytes(ord("1") if value == MINE else ord("0")
+                    for value in range(256))
+STATE_DIGITS = bytes(ord("0") + min(value, 3) for value in range(256))
+DIGIT_MINES = bytes(MINE if value == ord("1") else 0 for value in range(256))
+DIGIT_BITS = bytes(1 if value == ord("1") else 0 for value in range(256))
+
+
+def pack_mines(values):
+    """
+    :param values: bytearray, the values of the fields of a board
+    :return: bytes, one bit per field, set if the field has a mine, with the
+    first field in the lowest bit
+    """
+    digits = values.translate(MINE_DIGITS)[::-1]
+    return int(digits or b"0", 2).to_bytes((len(values) + 7) // 8, "little")
+
+
+def unpack_mines(data, size):
+    """
+    :param data: bytes, the mines packed by pack_mines()
+    :param size: int, number of fields
+    :return: bytes, MINE for every field that has a mine and 0 for the others
+    """
+    digits = f"{int.from_bytes(data, 'little'):0{size}b}".encode()
+    if len(digits) > size:
+        raise ValueError("mine layout doesn't fit the board")
+    return digits[::-1].translate(DIGIT_MINES)
+
+
+def pack_state(state):
+    """
+    :param state: bytearray, the state of the fields of a board
+    :return: bytes, two bits per field, with the first field in the lowest
+    bits
+    """
+    digits = state.translate(STATE_DIGITS)[::-1]
+    return int(digits or b"0", 4).to_bytes((len(state) + 3) // 4, "little")
+
+
+def unpack_state(data, size):
+    """
+    :param data: bytes, the state packed by pack_state()
+    :param size: int, number of fields
+    :return: bytes, the state of every field
+    """
+    digits = f"{int.from_bytes(data, 'little'):0{2 * size}b}".encode()
+    if len(digits) > 2 * size:
+        raise ValueError("state doesn't fit the board")
+    #  Every field is a pair of binary digits, the high digit first. A field
+    #  can't have both digits set, so the pairs can be added with an or.
+    high = int.from_bytes(digits[0::2].translate(DIGIT_BITS), "big") << 1
+    low = int.from_bytes(digits[1::2].translate(DIGIT_BITS), "big")
+    state = (high | low).to_bytes(size, "big")[::-1]
+    if state and max(state) > FLAGGED:
+        raise ValueError("invalid state")
+    return state
+
+
+def pack_settings(board, difficulty, first_click_safe=False, started=True,
+                  result=None):
+    """
+    :param board: Board, the board of the game
+    :param difficulty: int, the percentage of fields that have a mine
+    :param first_click_safe: bool, True if the mines around the first opened
+    field are moved elsewhere
+    :param started: bool, True if the first field has been opened
+    :param result: bool, True if the game was won, False if it was lost and
+    None if it is still on
+    :return: bytes, the settings of the game
+    """
+    flags = FIRST_CLICK_SAFE * first_click_safe + STARTED * started \
+        + ENDLESS * isinstance(board, ChunkedBoard) \
+        + WON * (result is True) + LOST * (result is False)
+    return SETTINGS.pack(TOPOLOGIES.index(board.get_topology()),
+                         board.get_height(), board.get_width(), difficulty,
+                         flags, board.get_seed())
+
+
+def unpack_settings(data, offset=0):
+    """
+    :param data: bytes, the data that the settings are in
+    :param offset: int, where the settings start
+    :return: dict, the topology, height, width, difficulty, seed,
+    first_click_safe, started, endless and result of the game
+    """
+    topology, height, width, difficulty, flags, seed = \
+        SETTINGS.unpack_from(data, offset)
+    return {"topology": TOPOLOGIES[topology], "height": height,
+            "width": width, "difficulty": difficulty, "seed": seed,
+            "first_click_safe": bool(flags & FIRST_CLICK_SAFE),
+            "started": bool(flags & STARTED),
+            "endless": bool(flags & ENDLESS),
+            "result": True if flags & WON else False if flags & LOST
+            else None}
+
+
+def dumps(board, difficulty, first_click_safe=False, started=True,
+          result=None):
+    """
+    :param board: Board, the board of the game
+    :param difficulty: int, the percentage of fields that have a mine
+    :param first_click_safe: bool, True if the mines around the first opened
+    field are moved elsewhere
+    :param started: bool, True if the first field has been opened
+    :param result: bool, True if the game was won, False if it was lost and
+    None if it is still on
+    :return: bytes, the game in the save format
+    """
+    if not isinstance(board, Board):
+        raise ValueError("only boards held in memory can be saved")
+    return FILE_HEADER.pack(SAVE_MAGIC, VERSION) \
+        + pack_settings(board, difficulty, first_click_safe, started,
+                        result) \
+        + pack_mines(board.get_values()) + pack_state(board.get_state())
+
+
+def loads(data):
+    """
+    :param data: bytes, a game in the save format
+    :return: (Board, dict), the board of the game and its settings, see
+    unpack_settings()
+    """
+    if len(data) < FILE_HEADER.size + SETTINGS.size \
+            or FILE_HEADER.unpack_from(data) != (SAVE_MAGIC, VERSION):
+        raise ValueError("not a saved game")
+    settings = unpack_settings(data, FILE_HEADER.size)
+    size = settings["height"] * settings["width"]
+    mines_start = FILE_HEADER.size + SETTINGS.size
+    state_start = mines_start + (size + 7) // 8
+    if len(data) != state_start + (size + 3) // 4:
+        raise ValueError("saved game is truncated")
+
+    board = Board(settings["height"], settings["width"],
+                  settings["topology"])
+    board.restore(unpack_mines(data[mines_start:state_start], size),
+                  unpack_state(data[state_start:], size), settings["seed"])
+    return board, settings
+
+
+def save(board, difficulty, first_click_safe=False, started=True,
+         result=None, path=SAVE_FILE):
+    """
+    Saves the game to a file.
+
+    :param board: Board, the board of the game
+    :param difficulty: int, the percentage of fields that have a mine
+    :param first_click_safe: bool, True if the mines around the first opened
+    field are moved elsewhere
+    :param started: bool, True if the first field has been opened
+    :param result: bool, True if the game was won, False if it was lost and
+    None if it is still on
+    :param path: str, the path of the file
+    """
+    data = dumps(board, difficulty, first_click_safe, started, result)
+    with open(path, "wb") as save_file:
+        save_file.write(data)
+
+
+def load(path=SAVE_FILE):
+    """
+    :param path: str, the path of a saved game
+    :return: (Board, dict), the board of the game and its settings, see
+    unpack_settings()
+    """
+    with open(path, "rb") as save_file:
+        return loads(save_file.read())
+
+
+class MoveLog:
+    """
+    Appends the moves of games to a log file. The file is opened for
+    appending, so the moves of earlier runs are kept, and every record is
+    written through right away so that a crash loses at most the move being
+    written.
+    """
+    def __init__(self, path=LOG_FILE):
+        """
+        :param path: str, the path of the log file
+        """
+        self.__file = open(path, "ab", buffering=0)
+        if self.__file.tell() == 0:
+            self.__file.write(FILE_HEADER.pack(LOG_MAGIC, VERSION))
+
+    def start_game(self, board, difficulty, first_click_safe=False):
+        """
+        Logs the start of a new game.
+
+        :param board: Board, the board of the game
+        :param difficulty: int, the percentage of fields that have a mine
+        :param first_click_safe: bool, True if the mines around the first
+        opened field are moved elsewhere
+        """
+        self.__file.write(
+            RECORD.pack(GAME, board.get_seed(), time.time_ns() // 1000)
+            + pack_settings(board, difficulty, first_click_safe, False))
+
+    def append(self, move, index):
+        """
+        Logs a move.
+
+        :param move: int, REVEAL, FLAG, CHORD or CHECK
+        :param index: int, index of the field, or 0 for CHECK
+        """
+        self.__file.write(RECORD.pack(move, index, time.time_ns() // 1000))
+
+    def close(self):
+        """
+        Closes the log file.
+        """
+        self.__file.close()
+
+
+def read_log(path=LOG_FILE):
+    """
+    Streams the records of a move log through a memory map. A record that
+    was only partly written is left out.
+
+    :param path: str, the path of the log file
+    :return: generator, (move, index, time, settings) tuples, where the time
+    is in microseconds since the epoch and the settings are those of the game
+    for GAME records (the index being the seed) and None for moves
+    """
+    with open(path, "rb") as log_file, \
+            mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < FILE_HEADER.size \
+                or FILE_HEADER.unpack_from(data) != (LOG_MAGIC, VERSION):
+            raise ValueError("not a move log")
+
+        offset = FILE_HEADER.size
+        end = len(data)
+        while offset + RECORD.size <= end:
+            move, index, moment = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            settings = None
+            if move == GAME:
+                if offset + SETTINGS.size > end:
+                    break
+                settings = unpack_settings(data, offset)
+                offset += SETTINGS.size
+            yield move, index, moment, settings
@@ -0,0 +1,404 @@
+"""
+A game server that hosts many independent headless games at once. Clients
+connect over a local TCP or Unix socket and talk in JSON lines: every request
+is a JSON object on a line of its own, and every response is one line too, in
+the same order as the requests.
+
+Requests:
+
+- {"cmd": "new", "height": 16, "width": 30, "difficulty": 15,
+  "seed": null, "topology": "square", "first_click_safe": true}
+  starts a new game; every key but "cmd" is optional. A board may have up
+  to MAX_FIELDS fields. The response has the "session" that the other
+  requests refer to.
+- {"cmd": "reveal", "session": 1, "row": 0, "col": 0}
+- {"cmd": "flag", "session": 1, "row": 0, "col": 0}
+- {"cmd": "chord", "session": 1, "row": 0, "col": 0}
+  make a move. The response has the fields that changed: "opened" as
+  [index, value] pairs, where a value of 9 is a mine, and "flagged" as
+  indices, and the "result" of the game: null while it is on, "won" or
+  "lost".
+- {"cmd": "moves", "session": 1, "moves": [["reveal", 0, 0],
+  ["flag", 1, 2], ["chord", 0, 1]]}
+  makes a batch of moves in one pass and responds with their changes
+  combined, like a single move.
+- {"cmd": "state", "session": 1}
+  returns the whole board as a string in "board", one character per field:
+  "." closed, "F" flagged, "0"-"8" opened and "*" an opened mine.
+- {"cmd": "close", "session": 1} ends a game.
+
+Every response has "ok", and "error" if the request failed. A request may
+have an "id", which is returned in the response. Games are kept between
+connections, and a game that hasn't been played for IDLE_TIMEOUT seconds is
+ended.
+
+Usage: python server.py [--host HOST] [--port PORT] [--unix PATH]
+                        [--idle-timeout SECONDS]
+"""
+import argparse
+import asyncio
+import json
+import time
+from itertools import count
+
+from board import MINE, OPENED, FLAGGED
+from gamegrid import GameGrid
+from moves import REVEAL, FLAG, CHORD
+from presets import NORMAL
+from topology import SQUARE, TOPOLOGIES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+#  How long a game may go unplayed, and how often the games are checked for
+#  it, in seconds.
+IDLE_TIMEOUT = 300
+IDLE_CHECK_INTERVAL = 10
+
+#  The limits of the server: how many games it hosts, how many fields a board
+#  may have and how long a request may be. All games share one thread, so a
+#  board is kept small enough to be created and opened in a few hundredths
+#  of a second, on any topology, without holding up the other games.
+MAX_SESSIONS = 10000
+MAX_FIELDS = 10000
+MAX_LINE = 65536
+
+#  The board of a new game if the request doesn't say otherwise.
+DEFAULT_HEIGHT = 16
+DEFAULT_WIDTH = 30
+DEFAULT_DIFFICULTY = NORMAL
+
+#  Translation table from the state of a field times 16 plus its value to
+#  the character that the field is shown as.
+VIEW_TABLE = bytes(
+    ord("*") if state == OPENED and value == MINE
+    else ord(str(value)) if state == OPENED and value < MINE
+    else ord("F") if state == FLAGGED
+    else ord(".")
+    for state in range(16) for value in range(16))
+
+MOVES = {"reveal": REVEAL, "flag": FLAG, "chord": CHORD}
+RESULTS = {None: None, True: "won", False: "lost"}
+
+
+class RequestError(Exception):
+    """
+    Raised when a request can't be carried out. The message is sent back to
+    the client.
+    """
+
+
+class SessionView:
+    """
+    Stands in for the user interface of a game on the server. Nothing is
+    drawn, as the changes of the moves are sent back instead, and a game
+    over leaves the fields as they are, so that a lost game doesn't send the
+    whole board.
+    """
+    def draw_fields(self, indices):
+        """
+        :param indices: list, the indices of the changed fields
+        """
+
+    def game_over(self, win, grid_object):
+        """
+        :param win: bool, True if won, False if lost
+        :param grid_object: GameGrid, the grid that the fields are stored in
+        """
+
+
+class Session:
+    """
+    A game hosted by the server, played on a GameGrid of its own.
+    """
+    def __init__(self, height, width, difficulty, seed, topology,
+                 first_click_safe):
+        """
+        :param height: int, number of rows on the board
+        :param width: int, number of columns on the board
+        :param difficulty: int, the percentage of fields that have a mine
+        :param seed: int, the seed of the board, or None for a random one
+        :param topology: str, the shape of the board
+        :param first_click_safe: bool, True if the first opened field is safe
+        """
+        self.__view = SessionView()
+        self.__grid_object = GameGrid()
+        self.__grid_object.generate_fields(height, width, difficulty,
+                                           self.__view, seed,
+                                           first_click_safe, topology)
+        self.__last_used = time.monotonic()
+
+    def play(self, moves):
+        """
+        Makes a batch of moves on the board.
+
+        :param moves: list, [command, row, col] lists, where the command is
+        "reveal", "flag" or "chord"
+        :return: dict, the response to the moves
+        """
+        self.__last_used = time.monotonic()
+        grid_object = self.__grid_object
+        board = grid_object.get_board()
+        if grid_object.get_result() is not None:
+            raise RequestError("the game is over")
+        batch = []
+        for move in moves:
+            if not isinstance(move, list) or len(move) != 3 \
+                    or not isinstance(move[0], str) or move[0] not in MOVES:
+                raise RequestError("a move must be [command, row, col]")
+            command, row, col = move
+            if not (is_int(row) and is_int(col)
+                    and 0 <= row < board.get_height()
+                    and 0 <= col < board.get_width()):
+                raise RequestError("no such field")
+            batch.append((MOVES[command], row, col))
+
+        changed, result = grid_object.apply_moves(batch)
+        opened = []
+        flagged = []
+        for index in changed:
+            if board.is_opened(index):
+                opened.append([index, board.get_value(index)])
+            elif board.is_flagged(index):
+                flagged.append(index)
+        return {"opened": opened, "flagged": flagged,
+                "result": RESULTS[result]}
+
+    def get_state(self):
+        """
+        :return: dict, the size, the number of mines and flags, the result
+        and the fields of the board
+        """
+        self.__last_used = time.monotonic()
+        board = self.__grid_object.get_board()
+        state = board.get_state()
+        #  The state and the value of every field are combined into one byte
+        #  in a single pass over big integers, and translated to characters.
+        fields = ((int.from_bytes(state, "little") << 4)
+                  + int.from_bytes(board.get_values(), "little"))
+        return {"height": board.get_height(), "width": board.get_width(),
+                "mines": board.get_number_of_mines(),
+                "flags": board.get_correct_flags()
+                + board.get_wrong_flags(),
+                "result": RESULTS[self.__grid_object.get_result()],
+                "board": fields.to_bytes(len(state), "little")
+                .translate(VIEW_TABLE).decode()}
+
+    def get_last_used(self):
+        """
+        :return: float, the monotonic time that the game was last played
+        """
+        return self.__last_used
+
+
+class GameServer:
+    """
+    Hosts the games and serves the requests of the clients. The games are
+    played within the event loop: a move on a board of the usual size takes
+    a fraction of a millisecond, far less than handing it to a thread would.
+    """
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, max_sessions=MAX_SESSIONS):
+        """
+        :param idle_timeout: float, how many seconds a game may go unplayed
+        :param max_sessions: int, how many games may be hosted at once
+        """
+        self.__idle_timeout = idle_timeout
+        self.__max_sessions = max_sessions
+        self.__sessions = {}
+        self.__ids = count(1)
+
+    def handle_request(self, request):
+        """
+        :param request: dict, the request of a client
+        :return: dict, the response to the request
+        """
+        try:
+            if not isinstance(request, dict):
+                raise RequestError("a request must be an object")
+            response = self.__dispatch(request)
+            response["ok"] = True
+        except RequestError as error:
+            response = {"ok": False, "error": str(error)}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def __dispatch(self, request):
+        """
+        :param request: dict, the request of a client
+        :return: dict, the response to the request, without "ok"
+        """
+        command = request.get("cmd")
+        if not isinstance(command, str):
+            raise RequestError("cmd must be a string")
+        if command == "new":
+            return self.__new_session(request)
+
+        session_id = get_int(request, "session")
+        session = self.__sessions.get(session_id)
+        if session is None:
+            raise RequestError("no such session")
+        if command in MOVES:
+            return session.play([[command, get_int(request, "row"),
+                                  get_int(request, "col")]])
+        elif command == "moves":
+            moves = request.get("moves")
+            if not isinstance(moves, list):
+                raise RequestError("moves must be a list")
+            return session.play(moves)
+        elif command == "state":
+            return session.get_state()
+        elif command == "close":
+            del self.__sessions[session_id]
+            return {}
+        raise RequestError(f"unknown command {command!r}")
+
+    def __new_session(self, request):
+        """
+        :param request: dict, a "new" request
+        :return: dict, the id of the new session and the size of its board
+        """
+        if len(self.__sessions) >= self.__max_sessions:
+            raise RequestError("too many sessions")
+        height = get_int(request, "height", DEFAULT_HEIGHT)
+        width = get_int(request, "width", DEFAULT_WIDTH)
+        if height < 1 or width < 1 or height * width > MAX_FIELDS:
+            raise RequestError("invalid size")
+        difficulty = get_int(request, "difficulty", DEFAULT_DIFFICULTY)
+        if not 0 <= difficulty <= 100:
+            raise RequestError("invalid difficulty")
+        seed = request.get("seed")
+        if seed is not None and not is_int(seed):
+            raise RequestError("invalid seed")
+        topology = request.get("topology", SQUARE)
+        if topology not in TOPOLOGIES:
+            raise RequestError("invalid topology")
+        first_click_safe = request.get("first_click_safe", True)
+        if not isinstance(first_click_safe, bool):
+            raise RequestError("first_click_safe must be true or false")
+
+        session_id = next(self.__ids)
+        self.__sessions[session_id] = Session(
+            height, width, difficulty, seed, topology, first_click_safe)
+        return {"session": session_id, "height": height, "width": width}
+
+    def expire_sessions(self):
+        """
+        Ends the games that haven't been played for too long.
+
+        :return: int, number of games ended
+        """
+        deadline = time.monotonic() - self.__idle_timeout
+        expired = [session_id
+                   for session_id, session in self.__sessions.items()
+                   if session.get_last_used() < deadline]
+        for session_id in expired:
+            del self.__sessions[session_id]
+        return len(expired)
+
+    def get_sessions(self):
+        """
+        :return: int, number of games hosted
+        """
+        return len(self.__sessions)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves the requests of a client until it disconnects.
+
+        :param reader: StreamReader, the stream that the requests come from
+        :param writer: StreamWriter, the stream that the responses go to
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = self.handle_request(json.loads(line))
+                except ValueError:
+                    response = {"ok": False, "error": "invalid JSON"}
+                writer.write(json.dumps(response,
+                                        separators=(",", ":")).encode()
+                             + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def expire_periodically(self):
+        """
+        Ends the idle games every IDLE_CHECK_INTERVAL seconds.
+        """
+        while True:
+            await asyncio.sleep(IDLE_CHECK_INTERVAL)
+            self.expire_sessions()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """
+        Serves clients until cancelled.
+
+        :param host: str, the address to listen on
+        :param port: int, the port to listen on
+        :param path: str, the path of a Unix socket to listen on instead
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(
+                self.handle_connection, path, limit=MAX_LINE)
+        else:
+            server = await asyncio.start_server(
+                self.handle_connection, host, port, limit=MAX_LINE)
+        expiry = asyncio.ensure_future(self.expire_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiry.cancel()
+
+
+def is_int(value):
+    """
+    :param value: a value from a request
+    :return: bool, True if the value is an integer, False if not, booleans
+    included
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def get_int(request, key, default=None):
+    """
+    :param request: dict, the request of a client
+    :param key: str, the key of the number
+    :param default: int, the number if the request doesn't have the key, or
+    None if the key is required
+    :return: int, the number
+    """
+    value = request.get(key, default)
+    if not is_int(value):
+        raise RequestError(f"{key} must be an integer")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Hosts headless games over a local socket.")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="port to listen on")
+    parser.add_argument("--unix", help="path of a Unix socket to listen on "
+                                       "instead")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help="seconds a game may go unplayed")
+    args = parser.parse_args()
+
+    server = GameServer(args.idle_timeout)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
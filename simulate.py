@@ -0,0 +1,239 @@
+"""
+Monte Carlo simulation of the board presets. Generates seeded boards of every
+size and difficulty that can be chosen from the menus, headless and in
+batches spread over all processors, and reports for every preset:
+
+- the real number of mines, as surrounded mines are turned into fields
+- the 3BV, the smallest number of clicks that opens every safe field
+- the share of boards that can be solved from the middle field without
+  guessing, as in the no-guess mode
+- the size of the largest region of connected zeros
+
+Every batch has a seed of its own, derived from the seed of the run, the
+preset and the number of the batch, so a run gives the same results however
+many processes it is spread over.
+
+Usage: python simulate.py [--boards N] [--batch N] [--seed N]
+                          [--workers N] [--csv FILE] [--json FILE]
+                          [--no-solver]
+"""
+import argparse
+import csv
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from board import Board, CLOSED
+from boardpool import get_start
+from presets import SIZES, DIFFICULTIES
+from solver import Solver
+
+DEFAULT_BOARDS = 10000
+DEFAULT_BATCH = 500
+DEFAULT_SEED = 0
+
+#  The columns of the CSV file, one row for every finished batch.
+CSV_FIELDS = ["size", "difficulty", "batch", "boards", "mines_total",
+              "mines_min", "mines_max", "3bv_total", "3bv_min", "3bv_max",
+              "no_guess", "largest_zero_total", "largest_zero_max"]
+
+
+def get_batch_seed(seed, size, difficulty, batch):
+    """
+    :param seed: int, the seed of the run
+    :param size: str, the size of the preset, e.g. "20x40"
+    :param difficulty: str, the difficulty of the preset, e.g. "Hard"
+    :param batch: int, the number of the batch within the preset
+    :return: int, the seed that the boards of the batch are drawn with
+    """
+    return random.Random(f"{seed}:{size}:{difficulty}:{batch}") \
+        .getrandbits(64)
+
+
+def analyze(board):
+    """
+    Opens every region of connected zeros on a newly generated board.
+
+    :param board: Board, the board to analyze
+    :return: (int, int), the 3BV of the board and the number of zeros in its
+    largest region of connected zeros
+    """
+    values = board.get_values()
+    state = board.get_state()
+    regions = 0
+    largest = 0
+    index = values.find(0)
+    while index != -1:
+        if state[index] == CLOSED:
+            revealed = board.open_connected_zeros(index)
+            regions += 1
+            largest = max(largest,
+                          sum(1 for field in revealed if not values[field]))
+        index = values.find(0, index + 1)
+
+    #  Every zero region takes one click, and every safe field that no
+    #  region opened takes one more.
+    return regions + board.get_closed_safe_fields(), largest
+
+
+def simulate_batch(height, width, difficulty, seed, boards, solve=True):
+    """
+    Generates and analyzes a batch of boards.
+
+    :param height: int, number of rows on the boards
+    :param width: int, number of columns on the boards
+    :param difficulty: int, the percentage of fields that have a mine
+    :param seed: int, the seed that the seeds of the boards are drawn with
+    :param boards: int, number of boards in the batch
+    :param solve: bool, True if the boards are checked for needing a guess
+    :return: dict, the totals, minimums and maximums of the batch, with the
+    keys of CSV_FIELDS that are about the boards
+    """
+    seeds = random.Random(seed)
+    board = Board(height, width)
+    start = board.get_index(*get_start(height, width))
+    mines = []
+    clicks = []
+    largest_zeros = []
+    no_guess = 0
+    for _ in range(boards):
+        board_seed = seeds.getrandbits(64)
+        board.generate(difficulty, board_seed)
+        mines.append(board.get_number_of_mines())
+        bv, largest = analyze(board)
+        clicks.append(bv)
+        largest_zeros.append(largest)
+
+        if solve:
+            board.generate(difficulty, board_seed)
+            board.move_mines_away(start)
+            no_guess += Solver(board).solve(start)
+
+    return {"boards": boards,
+            "mines_total": sum(mines), "mines_min": min(mines),
+            "mines_max": max(mines),
+            "3bv_total": sum(clicks), "3bv_min": min(clicks),
+            "3bv_max": max(clicks),
+            "no_guess": no_guess,
+            "largest_zero_total": sum(largest_zeros),
+            "largest_zero_max": max(largest_zeros)}
+
+
+class Summary:
+    """
+    The results of the finished batches of a preset added together.
+    """
+    def __init__(self):
+        self.__totals = {}
+
+    def add(self, batch):
+        """
+        :param batch: dict, the results of a batch, see simulate_batch()
+        """
+        totals = self.__totals
+        for key, value in batch.items():
+            if key not in totals:
+                totals[key] = value
+            elif key.endswith("_min"):
+                totals[key] = min(totals[key], value)
+            elif key.endswith("_max"):
+                totals[key] = max(totals[key], value)
+            else:
+                totals[key] += value
+
+    def as_dict(self, solve=True):
+        """
+        :param solve: bool, True if the boards were checked for needing a
+        guess
+        :return: dict, the number of boards and the averages, minimums and
+        maximums of the results
+        """
+        totals = self.__totals
+        boards = totals["boards"]
+        return {"boards": boards,
+                "mines_mean": totals["mines_total"] / boards,
+                "mines_min": totals["mines_min"],
+                "mines_max": totals["mines_max"],
+                "3bv_mean": totals["3bv_total"] / boards,
+                "3bv_min": totals["3bv_min"],
+                "3bv_max": totals["3bv_max"],
+                "no_guess_share": totals["no_guess"] / boards
+                if solve else None,
+                "largest_zero_mean": totals["largest_zero_total"] / boards,
+                "largest_zero_max": totals["largest_zero_max"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulates boards of every preset and reports their "
+                    "statistics.")
+    parser.add_argument("--boards", type=int, default=DEFAULT_BOARDS,
+                        help="number of boards of each preset")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH,
+                        help="number of boards in a batch")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="seed of the run")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes, one per processor by "
+                             "default")
+    parser.add_argument("--csv", help="file that the results of every "
+                                      "batch are written to as they finish")
+    parser.add_argument("--json", help="file that the summary is written to")
+    parser.add_argument("--no-solver", action="store_true",
+                        help="don't check if the boards need guessing")
+    args = parser.parse_args()
+    solve = not args.no_solver
+
+    summaries = {}
+    csv_file = open(args.csv, "w", newline="") if args.csv else None
+    writer = None
+    if csv_file is not None:
+        writer = csv.DictWriter(csv_file, CSV_FIELDS)
+        writer.writeheader()
+
+    with ProcessPoolExecutor(args.workers) as executor:
+        futures = {}
+        for size in SIZES:
+            height, width = (int(length) for length in size.split("x"))
+            for difficulty, level in DIFFICULTIES.items():
+                summaries[size, difficulty] = Summary()
+                for batch, first in enumerate(range(0, args.boards,
+                                                    args.batch)):
+                    seed = get_batch_seed(args.seed, size, difficulty, batch)
+                    boards = min(args.batch, args.boards - first)
+                    future = executor.submit(simulate_batch, height, width,
+                                             level, seed, boards, solve)
+                    futures[future] = (size, difficulty, batch)
+
+        for future in as_completed(futures):
+            size, difficulty, batch = futures[future]
+            results = future.result()
+            summaries[size, difficulty].add(results)
+            if writer is not None:
+                writer.writerow({"size": size, "difficulty": difficulty,
+                                 "batch": batch, **results})
+                csv_file.flush()
+
+    if csv_file is not None:
+        csv_file.close()
+
+    report = [{"size": size, "difficulty": difficulty,
+               **summary.as_dict(solve)}
+              for (size, difficulty), summary in summaries.items()]
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump({"seed": args.seed, "presets": report}, json_file,
+                      indent=2)
+
+    print(f"{'size':>8} {'difficulty':>10} {'mines':>9} {'3BV':>9} "
+          f"{'no-guess':>8} {'zeros':>7}")
+    for row in report:
+        no_guess = "-" if row["no_guess_share"] is None \
+            else f"{row['no_guess_share']:.1%}"
+        print(f"{row['size']:>8} {row['difficulty']:>10} "
+              f"{row['mines_mean']:>9.1f} {row['3bv_mean']:>9.1f} "
+              f"{no_guess:>8} {row['largest_zero_max']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Soak test for the game lifecycle. Plays games to the end and restarts them
+over and over inside the one event loop of the program, like a long session
+on a kiosk would, and reports the stack depth and the memory in use along the
+way. Both should stay flat however many games are played.
+
+Usage: python soak.py [number of games]
+"""
+import sys
+import tracemalloc
+
+from board import MINE
+from gamegrid import GameGrid
+from ui import UI
+
+DEFAULT_GAMES = 2000
+
+#  How many games are played before the first measurement, so that caches
+#  and the tiles of the canvas have settled.
+WARMUP_GAMES = 20
+
+#  How much the memory in use may grow during the measured games.
+MAX_MEMORY_GROWTH = 256 * 1024
+
+
+def stack_depth():
+    """
+    :return: int, number of frames on the Python stack of the caller
+    """
+    depth = 0
+    frame = sys._getframe(1)
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+
+class Soak:
+    """
+    Plays the games one event loop callback at a time and records the
+    measurements.
+    """
+    def __init__(self, games):
+        """
+        :param games: int, number of games to play
+        """
+        self.__games = games
+        self.__played = 0
+        self.__grid_object = GameGrid()
+        self.__ui = UI(self.__grid_object)
+        self.__first = None
+        self.__last = None
+
+    def run(self):
+        """
+        Plays the games and prints the results.
+
+        :return: bool, True if the stack depth and memory stayed flat
+        """
+        tracemalloc.start()
+        self.__ui.new_game(self.__grid_object)
+        self.__ui.get_mainwindow().after(0, self.play)
+        self.__ui.start()
+        tracemalloc.stop()
+
+        depth_first, memory_first = self.__first
+        depth_last, memory_last = self.__last
+        print(f"games played: {self.__played}")
+        print(f"stack depth: {depth_first} -> {depth_last}")
+        print(f"memory in use: {memory_first} -> {memory_last} bytes")
+        return depth_last <= depth_first \
+            and memory_last - memory_first <= MAX_MEMORY_GROWTH
+
+    def play(self):
+        """
+        Ends the current game by opening a mine or pressing Check, and
+        restarts it. Schedules itself again until all games are played.
+        """
+        grid_object = self.__grid_object
+        board = grid_object.get_board()
+
+        mine = board.get_values().find(MINE)
+        if self.__played % 2 and mine != -1:
+            grid_object.open_on_press(*board.get_row_col(mine))
+        else:
+            self.__ui.check_if_win(grid_object)
+        self.__ui.new_game(grid_object)
+        self.__played += 1
+
+        measurement = (stack_depth(), tracemalloc.get_traced_memory()[0])
+        if self.__played == WARMUP_GAMES:
+            self.__first = measurement
+        self.__last = measurement
+
+        if self.__played < self.__games:
+            self.__ui.get_mainwindow().after(0, self.play)
+        else:
+            self.__ui.stop()
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_GAMES
+    if not Soak(max(games, WARMUP_GAMES)).run():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
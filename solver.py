@@ -0,0 +1,325 @@
+from itertools import compress
+
+from board import MINE, CLOSED, OPENED, FLAGGED
+from topology import get_neighbor_counter, get_neighbor_lists
+
+#  Translation tables mapping fields in the given state to 1 and all other
+#  fields to 0.
+CLOSED_TABLE = bytes(1 if state == CLOSED else 0 for state in range(256))
+OPENED_TABLE = bytes(1 if state == OPENED else 0 for state in range(256))
+FLAGGED_TABLE = bytes(1 if state == FLAGGED else 0 for state in range(256))
+
+#  Added to the number of every field, so that subtracting the counts of the
+#  fields around it never takes the byte of a field below zero, even when
+#  the flags of a player outnumber the mines.
+OFFSET = 16
+
+
+class Solver:
+    """
+    Plays a board by logic alone. The solver only looks at what a player can
+    see: the opened fields, their numbers and the flags on the board. Mines
+    that it has deduced are flagged and safe fields are opened.
+
+    Three rules are used. The single-field rule looks at one opened field: if
+    its number is already met by flags, the rest of its closed neighbors are
+    safe, and if its closed neighbors are exactly as many as its missing
+    mines, they are all mines. The pairwise rule compares two opened fields
+    that share closed neighbors: if the difference of their missing mines
+    fills all the closed fields that only one of them touches, those fields
+    are mines and the ones only the other one touches are safe. The last
+    rule uses the number of mines left on the board.
+
+    The opened, flagged and closed fields are kept as big integers with one
+    byte per field, like the mines when a board counts them. The single-field
+    rule is applied to every field at once: the flags and the closed fields
+    around each field are counted by shifting the integers, and a pass takes
+    a few dozen integer operations however large the frontier is. The
+    pairwise rule goes through the fields one by one, so it only compares
+    the fields whose counts have changed since its last pass.
+
+    The board is updated when the solver is done, or after every step() if
+    the fields are opened a step at a time.
+    """
+    def __init__(self, board):
+        """
+        :param board: Board, the board to play
+        """
+        self.__board = board
+        self.__size = board.get_height() * board.get_width()
+        self.__count_neighbors = get_neighbor_counter(
+            board.get_height(), board.get_width(), board.get_topology())
+        self.__around = get_neighbor_lists(
+            board.get_height(), board.get_width(), board.get_topology())
+
+        #  A byte of 1, 7, 15, 16 and 127 for every field.
+        ones = int.from_bytes(b"\x01" * self.__size, "little")
+        self.__ones = ones
+        self.__sevens = 7 * ones
+        self.__nibbles = 15 * ones
+        self.__offsets = OFFSET * ones
+        self.__halves = 127 * ones
+
+        self.__values = int.from_bytes(board.get_values(), "little") \
+            + self.__offsets
+        #  The mines are only used to find out whether an opened field had a
+        #  mine, which the board would tell a player.
+        self.__mines = int.from_bytes(board.get_mines(), "little")
+        self.__lost = False
+
+        #  The counts of the flags and the closed fields around every field
+        #  and the opened fields at the last pass of the pairwise rule.
+        self.__compared = 0
+        self.__compared_opened = 0
+
+        self.__opened = 0
+        self.__flagged = 0
+        self.__closed = 0
+        self.__read_board()
+
+    def solve(self, start=None):
+        """
+        Opens the starting field, if given, and keeps applying the rules
+        until the board is solved or nothing more can be deduced.
+
+        :param start: int, index of the field to open first, or None
+        :return: bool, True if every safe field has been opened, False if the
+        board can't be solved without guessing
+        """
+        if start is not None and not self.open([start]):
+            return False
+        while self.__step():
+            pass
+        self.__write_board()
+        return self.__board.get_closed_safe_fields() == 0
+
+    def step(self):
+        """
+        Applies the rules until some fields have been opened or flagged.
+
+        :return: bool, True if progress was made, False if the solver is
+        stuck or the board is solved
+        """
+        progress = self.__step()
+        self.__write_board()
+        return progress
+
+    def __step(self):
+        """
+        :return: bool, True if progress was made, False if not
+        """
+        if self.__lost:
+            return False
+
+        safe, mines = self.__single_field_rule()
+        if not safe and not mines:
+            #  The board may have been solved, which is only checked once
+            #  the cheapest rule runs out.
+            if not (self.__closed | self.__flagged) & ~self.__mines:
+                return False
+            safe, mines = self.__pairwise_rule()
+        if not safe and not mines:
+            safe, mines = self.__mine_count_rule()
+        if not safe and not mines:
+            return False
+
+        #  Only a wrong flag of the player can make a field look both safe
+        #  and a mine.
+        mines &= ~safe
+        self.__flagged |= mines
+        self.__closed &= ~(safe | mines)
+        self.__opened |= safe
+        if safe & self.__mines:
+            self.__lost = True
+            return False
+        return True
+
+    def open(self, fields):
+        """
+        Opens fields, and the zeros connected to them, on the board.
+
+        :param fields: list, indices of the fields
+        :return: bool, False if one of the fields was a mine, True if not
+        """
+        board = self.__board
+        values = board.get_values()
+        self.__write_board()
+        try:
+            for index in fields:
+                if values[index] == MINE:
+                    board.open_field(index)
+                    return False
+                board.open_connected_zeros(index)
+            return True
+        finally:
+            self.__read_board()
+
+    def flag(self, fields):
+        """
+        Flags fields on the board.
+
+        :param fields: list, indices of the fields
+        """
+        board = self.__board
+        self.__write_board()
+        for index in fields:
+            board.flag(index)
+        self.__read_board()
+
+    def __read_board(self):
+        """
+        Reads the opened, flagged and closed fields from the board.
+        """
+        state = self.__board.get_state()
+        self.__opened = int.from_bytes(state.translate(OPENED_TABLE),
+                                       "little")
+        self.__flagged = int.from_bytes(state.translate(FLAGGED_TABLE),
+                                        "little")
+        self.__closed = int.from_bytes(state.translate(CLOSED_TABLE),
+                                       "little")
+        self.__lost = self.__board.is_lost()
+
+    def __write_board(self):
+        """
+        Sets the state of the fields on the board to the solver's.
+        """
+        self.__board.set_state(
+            (self.__opened * OPENED + self.__flagged * FLAGGED).to_bytes(
+                self.__size, "little"))
+
+    def __count(self):
+        """
+        :return: (int, int), the number of flags and of closed fields around
+        every field, a byte per field
+        """
+        #  Both are counted at once, the flags in the low half of the bytes
+        #  and the closed fields in the high half.
+        counts = self.__count_neighbors(self.__flagged + (self.__closed << 4))
+        return counts & self.__nibbles, (counts >> 4) & self.__nibbles
+
+    def __zero(self, fields):
+        """
+        :param fields: int, a byte below 128 for every field
+        :return: int, a byte of 1 for every field whose byte is 0
+        """
+        return self.__ones & ~((fields + self.__halves) >> 7)
+
+    def __nonzero(self, fields):
+        """
+        :param fields: int, a byte below 9 for every field
+        :return: int, a byte of 1 for every field whose byte isn't 0
+        """
+        return ((fields + self.__sevens) >> 3) & self.__ones
+
+    def __single_field_rule(self):
+        """
+        Applies the single-field rule to every opened field. All deductions
+        are made from the same state before any of them is acted on.
+
+        :return: (int, int), the fields found safe and the mines found, a
+        byte of 1 for every field
+        """
+        flags, closed = self.__count()
+        #  The mines missing around every field, plus OFFSET.
+        missing = self.__values - flags
+        offsets = self.__offsets
+        done = self.__zero(missing ^ offsets) & self.__opened
+        full = self.__zero((missing - closed) ^ offsets) & self.__opened
+        if not done and not full:
+            return 0, 0
+
+        found = self.__count_neighbors(done + (full << 4))
+        safe = self.__nonzero(found & self.__nibbles) & self.__closed
+        mines = self.__nonzero((found >> 4) & self.__nibbles) & self.__closed
+        return safe, mines
+
+    def __pairwise_rule(self):
+        """
+        Compares every opened field whose counts have changed since the last
+        pass with the opened fields that share closed neighbors with it.
+
+        :return: (int, int), the fields found safe and the mines found, a
+        byte of 1 for every field
+        """
+        size = self.__size
+        around = self.__around
+        flags, closed_counts = self.__count()
+        counts = flags + (closed_counts << 4)
+        changed = counts ^ self.__compared
+        self.__compared = counts
+        #  A byte of 1 for the fields whose counts changed or that have been
+        #  opened since, of the opened fields that have closed neighbors.
+        changed = ((((changed & self.__halves) + self.__halves) | changed)
+                   >> 7) & self.__ones
+        changed |= self.__opened & ~self.__compared_opened
+        self.__compared_opened = self.__opened
+        changed &= self.__opened & self.__nonzero(closed_counts)
+        if not changed:
+            return 0, 0
+
+        opened = self.__opened.to_bytes(size, "little")
+        closed = self.__closed.to_bytes(size, "little")
+        missing = (self.__values - flags).to_bytes(size, "little")
+        changed = set(compress(range(size), changed.to_bytes(size, "little")))
+        constraints = {}
+        safe = set()
+        mines = set()
+        for index in changed:
+            if index not in constraints:
+                constraints[index] = {neighbor for neighbor in around[index]
+                                      if closed[neighbor]}
+            here = constraints[index]
+
+            others = {other for field in here for other in around[field]
+                      if opened[other]}
+            others.discard(index)
+
+            for other in others:
+                #  Two changed fields are only compared once.
+                if other < index and other in changed:
+                    continue
+                if other not in constraints:
+                    constraints[other] = {neighbor
+                                          for neighbor in around[other]
+                                          if closed[neighbor]}
+                there = constraints[other]
+                if not there:
+                    continue
+                only_here = here - there
+                only_there = there - here
+                if not only_here and not only_there:
+                    continue
+                if missing[index] - missing[other] == len(only_here):
+                    safe.update(only_there)
+                    mines.update(only_here)
+                elif missing[other] - missing[index] == len(only_there):
+                    safe.update(only_here)
+                    mines.update(only_there)
+        return self.__pack(safe), self.__pack(mines)
+
+    def __mine_count_rule(self):
+        """
+        Uses the number of mines left on the board: if every mine is flagged,
+        the rest of the closed fields are safe, and if the closed fields are
+        exactly as many as the mines left, they are all mines.
+
+        :return: (int, int), the fields found safe and the mines found, a
+        byte of 1 for every field
+        """
+        mines_left = self.__board.get_number_of_mines() \
+            - self.__flagged.bit_count()
+        if mines_left == 0:
+            return self.__closed, 0
+        if mines_left == self.__closed.bit_count():
+            return 0, self.__closed
+        return 0, 0
+
+    def __pack(self, fields):
+        """
+        :param fields: set, indices of fields
+        :return: int, a byte of 1 for each of the fields
+        """
+        packed = bytearray(self.__size)
+        for index in fields:
+            packed[index] = 1
+        return int.from_bytes(packed, "little")
@@ -0,0 +1,79 @@
+import random
+import unittest
+
+from board import Board, MINE, CLOSED, OPENED
+from topology import TOPOLOGIES
+
+
+def open_by_search(board, index):
+    """
+    Opens the field and the zeros connected to it the plain way, one field at
+    a time, on a copy of the state of the board.
+
+    :param board: Board, the board to open the fields of
+    :param index: int, index of the field
+    :return: set, the indices of the fields that would be opened
+    """
+    state = bytearray(board.get_state())
+    values = board.get_values()
+    if state[index] != CLOSED:
+        return set()
+    opened = {index}
+    stack = [index] if values[index] == 0 else []
+    while stack:
+        for neighbor in board.get_neighbors(stack.pop()):
+            if state[neighbor] == CLOSED and neighbor not in opened:
+                opened.add(neighbor)
+                if values[neighbor] == 0:
+                    stack.append(neighbor)
+    return opened
+
+
+class TestOpenConnectedZeros(unittest.TestCase):
+    def test_matches_search(self):
+        rng = random.Random(1)
+        for topology in TOPOLOGIES:
+            for game in range(500):
+                height = rng.randint(1, 12)
+                width = rng.randint(1, 12)
+                board = Board(height, width, topology)
+                board.generate(rng.choice([0, 1, 5, 10, 20]), game)
+                for _ in range(rng.randint(0, 5)):
+                    board.flag(rng.randrange(height * width))
+                for _ in range(rng.randint(0, 3)):
+                    index = rng.randrange(height * width)
+                    if not board.is_mine(index):
+                        board.open_connected_zeros(index)
+
+                index = rng.randrange(height * width)
+                if board.is_mine(index):
+                    continue
+                expected = open_by_search(board, index)
+                before = bytes(board.get_state())
+                revealed = board.open_connected_zeros(index)
+                self.assertEqual(len(revealed), len(set(revealed)))
+                self.assertEqual(set(revealed), expected,
+                                 (topology, height, width, game))
+                for field, state in enumerate(board.get_state()):
+                    self.assertEqual(state == OPENED, before[field] == OPENED
+                                     or field in expected)
+
+    def test_counts_follow_the_fill(self):
+        board = Board(30, 30)
+        board.generate(10, 3)
+        safe = board.get_closed_safe_fields()
+        index = board.get_values().index(0)
+        revealed = board.open_connected_zeros(index)
+        self.assertEqual(board.get_closed_safe_fields(), safe - len(revealed))
+        self.assertFalse(board.is_lost())
+
+    def test_large_empty_board(self):
+        board = Board(300, 300)
+        board.generate(0, 0)
+        self.assertEqual(len(board.open_connected_zeros(0)), 300 * 300)
+        self.assertEqual(board.get_closed_safe_fields(), 0)
+        self.assertNotIn(MINE, board.get_values())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import random
+import unittest
+
+from gamegrid import GameGrid
+from history import History, find_changes, make_diff
+from moves import REVEAL, FLAG, CHORD
+
+
+def snapshot(grid_object):
+    """
+    :param grid_object: GameGrid, the grid of the game
+    :return: tuple, everything about the game that moving through its
+    history has to bring back
+    """
+    board = grid_object.get_board()
+    return (bytes(board.get_state()), bytes(board.get_values()),
+            board.is_lost(), board.is_won(),
+            board.get_closed_safe_fields(), board.get_correct_flags(),
+            board.get_wrong_flags(),
+            grid_object.get_result())
+
+
+class TestHistory(unittest.TestCase):
+    def test_seek_through_checkpoints(self):
+        rng = random.Random(2)
+        size = 64
+        state = bytearray(size)
+        snapshots = [bytes(state)]
+        history = History()
+        #  Moves are undone and made again along the way, so that the
+        #  checkpoints are dropped and built again at every level.
+        for _ in range(700):
+            if rng.random() < 0.1 and history.get_position():
+                position = rng.randrange(history.get_position() + 1)
+                for indices, states in history.seek(position):
+                    for index, field in zip(indices, states):
+                        state[index] = field
+                del snapshots[position + 1:]
+            before = bytes(state)
+            for _ in range(rng.randint(1, 5)):
+                state[rng.randrange(size)] = rng.randrange(3)
+            history.record(make_diff(find_changes(before, state), before,
+                                     state), None, True)
+            snapshots.append(bytes(state))
+
+        self.assertEqual(history.get_length(), len(snapshots) - 1)
+        for _ in range(500):
+            position = rng.randrange(len(snapshots))
+            for indices, states in history.seek(position):
+                for index, field in zip(indices, states):
+                    state[index] = field
+            self.assertEqual(bytes(state), snapshots[position])
+        with self.assertRaises(IndexError):
+            history.seek(len(snapshots))
+
+    def test_jumps_match_snapshots(self):
+        rng = random.Random(1)
+        for game in range(60):
+            grid_object = GameGrid()
+            height, width = rng.choice([(9, 9), (16, 30), (20, 20)])
+            grid_object.generate_fields(
+                height, width, rng.choice([10, 15, 20]), seed=game,
+                first_click_safe=rng.random() < 0.7)
+            history = grid_object.get_history()
+            snapshots = [snapshot(grid_object)]
+            while grid_object.get_result() is None:
+                moves = [(rng.choice([REVEAL] * 6 + [FLAG, CHORD]),
+                          rng.randrange(height), rng.randrange(width))
+                         for _ in range(rng.choice([1, 1, 1, 3]))]
+                position = history.get_position()
+                grid_object.apply_moves(moves)
+                if history.get_position() != position:
+                    snapshots.append(snapshot(grid_object))
+                #  Now and then a move is made after going back, which drops
+                #  the moves after it.
+                if rng.random() < 0.05 and history.get_position():
+                    position = rng.randrange(history.get_position())
+                    grid_object.jump_to(position)
+                    self.assertEqual(snapshot(grid_object),
+                                     snapshots[position])
+                    del snapshots[position + 1:]
+
+            self.assertEqual(history.get_length(), len(snapshots) - 1)
+            for _ in range(30):
+                position = rng.randrange(len(snapshots))
+                grid_object.jump_to(position)
+                self.assertEqual(snapshot(grid_object), snapshots[position],
+                                 (game, position))
+            grid_object.jump_to(0)
+            while grid_object.redo():
+                pass
+            self.assertEqual(snapshot(grid_object), snapshots[-1])
+            while grid_object.undo():
+                pass
+            self.assertEqual(snapshot(grid_object), snapshots[0])
+
+    def test_check_is_undone(self):
+        grid_object = GameGrid()
+        grid_object.generate_fields(9, 9, 10, seed=2)
+        grid_object.open_on_press(4, 4)
+        before = snapshot(grid_object)
+        grid_object.check()
+        self.assertIsNotNone(grid_object.get_result())
+        grid_object.undo()
+        self.assertEqual(snapshot(grid_object), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import itertools
+import unittest
+
+from board import Board, MINE, CLOSED, OPENED, FLAGGED
+from probability import MineProbabilities
+from solver import Solver
+from topology import TOPOLOGIES
+
+#  The most closed fields that the layouts are enumerated for.
+MAX_CLOSED = 16
+
+
+def enumerate_probabilities(board):
+    """
+    Calculates the probabilities by trying every layout of the mines left on
+    the closed fields.
+
+    :param board: Board, the board to calculate the probabilities for
+    :return: dict, the probability of a mine for every closed field by its
+    index, or None if no layout fits
+    """
+    state = board.get_state()
+    values = board.get_values()
+    closed = [index for index, field in enumerate(state) if field == CLOSED]
+    mines_left = board.get_number_of_mines() - state.count(FLAGGED)
+    constraints = []
+    for index, field in enumerate(state):
+        if field == OPENED and values[index]:
+            around = board.get_neighbors(index)
+            constraints.append((
+                [neighbor for neighbor in around
+                 if state[neighbor] == CLOSED],
+                values[index] - sum(1 for neighbor in around
+                                    if state[neighbor] == FLAGGED)))
+
+    mines = dict.fromkeys(closed, 0)
+    layouts = 0
+    for layout in itertools.combinations(closed, mines_left):
+        layout = set(layout)
+        if all(sum(1 for field in fields if field in layout) == count
+               for fields, count in constraints):
+            layouts += 1
+            for field in layout:
+                mines[field] += 1
+    if not layouts:
+        return None
+    return {field: count / layouts for field, count in mines.items()}
+
+
+class TestMineProbabilities(unittest.TestCase):
+    def assert_matches(self, probabilities, board):
+        expected = enumerate_probabilities(board)
+        if expected is None:
+            self.assertIsNone(probabilities)
+            return
+        self.assertEqual(probabilities.keys(), expected.keys())
+        for field, probability in expected.items():
+            self.assertAlmostEqual(probabilities[field], probability)
+
+    def test_matches_enumeration(self):
+        checked = 0
+        for topology in TOPOLOGIES:
+            for seed in range(150):
+                board = Board(5, 6, topology)
+                board.generate(20, seed)
+                start = board.get_index(2, 3)
+                board.move_mines_away(start)
+                solver = Solver(board)
+                solver.open([start])
+                calculator = MineProbabilities(board)
+                #  The same calculator is used after the solver has moved
+                #  on, so the components it kept are checked as well.
+                for _ in range(3):
+                    if board.get_state().count(CLOSED) <= MAX_CLOSED:
+                        self.assert_matches(calculator.calculate(), board)
+                        self.assertTrue(calculator.is_exact())
+                        checked += 1
+                    if not solver.step():
+                        break
+        self.assertGreater(checked, 100)
+
+    def test_no_layout_fits(self):
+        #  A mine on the first field of a row of four, with the 1 next to it
+        #  opened and a wrong flag on the last field. The flag takes the
+        #  only mine of the board, which the 1 still needs.
+        board = Board(1, 4)
+        board.restore(bytes([MINE, 0, 0, 0]),
+                      bytes([CLOSED, OPENED, CLOSED, FLAGGED]))
+        self.assertIsNone(MineProbabilities(board).calculate())
+        self.assertIsNone(enumerate_probabilities(board))
+
+if __name__ == "__main__":
+    unittest.main()
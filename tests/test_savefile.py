@@ -0,0 +1,122 @@
+import os
+import random
+import tempfile
+import unittest
+
+import savefile
+from board import Board
+from gamegrid import GameGrid
+from moves import REVEAL, FLAG, CHECK
+from topology import TOPOLOGIES
+
+
+class TestSaveFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_round_trip(self):
+        rng = random.Random(1)
+        for topology in TOPOLOGIES:
+            for height, width in [(1, 1), (7, 13), (20, 40)]:
+                board = Board(height, width, topology)
+                board.generate(22, rng.getrandbits(64))
+                board.move_mines_away(rng.randrange(height * width))
+                for index in range(height * width):
+                    chance = rng.random()
+                    if chance < 0.3:
+                        board.open_field(index)
+                    elif chance < 0.4:
+                        board.flag(index)
+
+                loaded, settings = savefile.loads(
+                    savefile.dumps(board, 22, True, True))
+                self.assertEqual(loaded.get_values(), board.get_values())
+                self.assertEqual(loaded.get_state(), board.get_state())
+                for getter in ("get_correct_flags", "get_wrong_flags",
+                               "get_closed_safe_fields", "is_lost",
+                               "get_number_of_mines", "get_seed",
+                               "get_topology"):
+                    self.assertEqual(getattr(loaded, getter)(),
+                                     getattr(board, getter)(), getter)
+                self.assertEqual(settings["difficulty"], 22)
+                self.assertTrue(settings["first_click_safe"])
+                self.assertIsNone(settings["result"])
+
+    def test_broken_files(self):
+        board = Board(5, 5)
+        board.generate(20, 1)
+        data = savefile.dumps(board, 20)
+        for broken in (b"", data[:-1], data + b"\0", b"MSWL" + data[4:]):
+            with self.assertRaises(ValueError):
+                savefile.loads(broken)
+
+    def test_result_is_kept(self):
+        path = self.path("save.bin")
+        grid_object = GameGrid()
+        loaded = GameGrid()
+
+        #  Won by flagging every mine.
+        grid_object.generate_fields(8, 8, 15, seed=3)
+        board = grid_object.get_board()
+        for index in range(64):
+            if board.is_mine(index):
+                grid_object.flag_field(*board.get_row_col(index))
+        self.assertTrue(grid_object.get_result())
+        grid_object.save_game(path)
+        loaded.load_game(path=path)
+        self.assertTrue(loaded.get_result())
+
+        #  Lost by checking with a wrong flag.
+        grid_object.generate_fields(8, 8, 15, seed=4)
+        grid_object.open_on_press(4, 4)
+        board = grid_object.get_board()
+        index = next(index for index in range(64)
+                     if not board.is_mine(index)
+                     and not board.is_opened(index))
+        grid_object.flag_field(*board.get_row_col(index))
+        self.assertFalse(grid_object.check())
+        grid_object.save_game(path)
+        loaded.load_game(path=path)
+        self.assertIs(loaded.get_result(), False)
+
+        #  Still on.
+        grid_object.generate_fields(8, 8, 15, seed=5)
+        grid_object.open_on_press(4, 4)
+        grid_object.save_game(path)
+        loaded.load_game(path=path)
+        self.assertIsNone(loaded.get_result())
+        self.assertEqual(loaded.get_board().get_state(),
+                         grid_object.get_board().get_state())
+
+    def test_move_log(self):
+        path = self.path("moves.log")
+        move_log = savefile.MoveLog(path)
+        grid_object = GameGrid()
+        grid_object.set_move_log(move_log)
+        #  A negative seed is logged as the 64-bit seed that the board was
+        #  actually generated with.
+        grid_object.generate_fields(9, 9, 10, seed=-1)
+        grid_object.flag_field(0, 0)
+        grid_object.open_on_press(4, 4)
+        grid_object.check()
+        move_log.close()
+        #  A record that was only partly written is left out.
+        with open(path, "ab") as log_file:
+            log_file.write(b"\1\2")
+
+        records = list(savefile.read_log(path))
+        self.assertEqual([record[0] for record in records],
+                         [savefile.GAME, FLAG, REVEAL, CHECK])
+        seed = records[0][1]
+        self.assertEqual(seed, grid_object.get_board().get_seed())
+        self.assertEqual(records[0][3]["seed"], seed)
+        self.assertEqual(records[1][1], 0)
+        self.assertEqual(records[2][1], 4 * 9 + 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,239 @@
+from array import array
+from functools import lru_cache
+
+#  The shapes a board can have. On a torus the edges of the board wrap around
+#  to the opposite edge. A hex board is stored in rows like the others, with
+#  every odd row shifted half a field to the right.
+SQUARE = "square"
+TORUS = "torus"
+HEX = "hex"
+
+TOPOLOGIES = [SQUARE, TORUS, HEX]
+
+#  The (row, col) offsets of the surrounding fields.
+SQUARE_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1),
+                  (1, 0), (1, 1))
+HEX_EVEN_ROW_OFFSETS = ((-1, -1), (-1, 0), (0, -1), (0, 1), (1, -1), (1, 0))
+HEX_ODD_ROW_OFFSETS = ((-1, 0), (-1, 1), (0, -1), (0, 1), (1, 0), (1, 1))
+
+#  The number of fields surrounding a field that isn't on an edge.
+FULL_DEGREE = {SQUARE: 8, TORUS: 8, HEX: 6}
+
+#  How many neighbor tables are kept. Games are usually played on the same
+#  few sizes over and over, so the tables are shared between boards.
+CACHED_TABLES = 16
+
+
+@lru_cache(maxsize=CACHED_TABLES)
+def get_neighbor_table(height, width, topology=SQUARE):
+    """
+    Builds the table of surrounding fields for every field of a board, in
+    compressed sparse row form: the indices of the fields surrounding the
+    field i are neighbors[starts[i]:starts[i + 1]]. The table is built once
+    for each size and topology and shared by every board of that kind.
+
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :param topology: str, SQUARE, TORUS or HEX
+    :return: (array, array), the starts and the neighbors
+    """
+    if topology not in FULL_DEGREE:
+        raise ValueError(f"unknown topology: {topology}")
+
+    starts = array("i", [0])
+    neighbors = array("i")
+    for row in range(height):
+        if topology == HEX:
+            offsets = HEX_ODD_ROW_OFFSETS if row % 2 else HEX_EVEN_ROW_OFFSETS
+        else:
+            offsets = SQUARE_OFFSETS
+
+        #  Away from the left and right edge, every field of the row has its
+        #  neighbors at the same distances, so they are added a row at a time.
+        #  A torus less than three rows high reaches the same row from above
+        #  and below, so it is handled one field at a time.
+        if topology == TORUS and height < 3:
+            middle_cols = range(0)
+            edge_cols = range(width)
+        else:
+            middle_cols = range(1, width - 1)
+            edge_cols = [0, width - 1] if width > 1 else [0]
+        distances = []
+        for row_offset, col_offset in offsets:
+            r = row + row_offset
+            if topology == TORUS:
+                r %= height
+            elif not 0 <= r < height:
+                continue
+            distances.append((r - row) * width + col_offset)
+
+        for col in edge_cols[:1]:
+            neighbors.extend(
+                _find_neighbors(row, col, height, width, topology, offsets))
+            starts.append(len(neighbors))
+        if middle_cols:
+            first = row * width + middle_cols[0]
+            degree = len(distances)
+            block = [0] * (degree * len(middle_cols))
+            for position, distance in enumerate(distances):
+                block[position::degree] = range(
+                    first + distance, first + distance + len(middle_cols))
+            neighbors.extend(block)
+            starts.extend(range(starts[-1] + degree,
+                                starts[-1] + degree * len(middle_cols) + 1,
+                                degree))
+        for col in edge_cols[1:]:
+            neighbors.extend(
+                _find_neighbors(row, col, height, width, topology, offsets))
+            starts.append(len(neighbors))
+    return starts, neighbors
+
+
+@lru_cache(maxsize=CACHED_TABLES)
+def get_neighbor_lists(height, width, topology=SQUARE):
+    """
+    The neighbor table as a tuple of surrounding fields for every field,
+    which is faster to go through one field at a time than slices of the
+    table.
+
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :param topology: str, SQUARE, TORUS or HEX
+    :return: list, the tuple of the fields surrounding each field
+    """
+    starts, neighbors = get_neighbor_table(height, width, topology)
+    return [tuple(neighbors[starts[index]:starts[index + 1]])
+            for index in range(height * width)]
+
+
+def find_neighbors(row, col, height, width, topology=SQUARE):
+    """
+    Finds the surrounding fields of a single field without building the
+    neighbor table of the whole board.
+
+    :param row: int, row index of the field
+    :param col: int, column index of the field
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :param topology: str, SQUARE, TORUS or HEX
+    :return: list, the indices of the fields surrounding the field
+    """
+    if topology == HEX:
+        offsets = HEX_ODD_ROW_OFFSETS if row % 2 else HEX_EVEN_ROW_OFFSETS
+    else:
+        offsets = SQUARE_OFFSETS
+    return _find_neighbors(row, col, height, width, topology, offsets)
+
+
+def _find_neighbors(row, col, height, width, topology, offsets):
+    """
+    :param row: int, row index of the field
+    :param col: int, column index of the field
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :param topology: str, SQUARE, TORUS or HEX
+    :param offsets: tuple, the (row, col) offsets of the surrounding fields
+    :return: list, the indices of the fields surrounding the field
+    """
+    index = row * width + col
+    found = []
+    for row_offset, col_offset in offsets:
+        r = row + row_offset
+        c = col + col_offset
+        if topology == TORUS:
+            r %= height
+            c %= width
+        elif not (0 <= r < height and 0 <= c < width):
+            continue
+        neighbor = r * width + c
+        #  On a torus narrower than three fields the same field can be
+        #  reached from several directions, or be the field itself.
+        if neighbor != index and neighbor not in found:
+            found.append(neighbor)
+    return found
+
+
+@lru_cache(maxsize=CACHED_TABLES)
+def get_neighbor_counter(height, width, topology=SQUARE):
+    """
+    Builds a function that counts the surrounding fields of every field of a
+    board in one batch. The fields are packed into a big integer with one
+    byte per field, in the same order as on the board, and the count of a
+    field is the sum of the bytes of the fields surrounding it. The sums
+    are taken by shifting the whole integer one field or one row at a time,
+    so the bytes of the fields must be small enough for a sum to fit in a
+    byte.
+
+    :param height: int, number of rows on the board
+    :param width: int, number of columns on the board
+    :param topology: str, SQUARE, TORUS or HEX
+    :return: function, taking the packed fields as an int and returning the
+    counts packed the same way
+    """
+    if topology not in FULL_DEGREE:
+        raise ValueError(f"unknown topology: {topology}")
+    size = height * width
+    row = 8 * width
+    full = (1 << 8 * size) - 1
+    #  The horizontal shifts would carry fields over the edge of a row to
+    #  the next one, so the first or the last column is masked out first.
+    first_col = int.from_bytes((b"\x01" + bytes(width - 1)) * height,
+                               "little") * 0xFF
+    last_col = first_col << 8 * (width - 1)
+    not_first_col = full & ~first_col
+    not_last_col = full & ~last_col
+
+    def from_left(fields):
+        return (fields & not_last_col) << 8
+
+    def from_right(fields):
+        return (fields & not_first_col) >> 8
+
+    if topology == SQUARE:
+        def count(fields):
+            rows = fields + ((fields & not_last_col) << 8) \
+                + ((fields & not_first_col) >> 8)
+            return (rows + (rows << row) + (rows >> row) - fields) & full
+
+    elif topology == TORUS and height >= 3 and width >= 3:
+        #  The fields that are shifted over an edge come back on the other
+        #  side of the board.
+        wrap = 8 * (width - 1)
+        last_row = 8 * (size - width)
+
+        def count(fields):
+            rows = fields + from_left(fields) + ((fields & last_col) >> wrap) \
+                + from_right(fields) + ((fields & first_col) << wrap)
+            return (rows + (rows << row) + (rows >> last_row)
+                    + (rows >> row) + (rows << last_row) - fields) & full
+
+    elif topology == HEX:
+        #  The fields above and below are the ones to the left in the even
+        #  rows and the ones to the right in the odd rows.
+        even_rows = int.from_bytes(
+            (b"\xff" * width + bytes(width)) * (height // 2)
+            + b"\xff" * width * (height % 2), "little")
+        odd_rows = full & ~even_rows
+
+        def count(fields):
+            above = (fields << row) & full
+            below = fields >> row
+            return (from_left(fields) + from_right(fields)
+                    + above + (from_left(above) & even_rows)
+                    + (from_right(above) & odd_rows)
+                    + below + (from_left(below) & even_rows)
+                    + (from_right(below) & odd_rows)) & full
+
+    else:
+        #  A torus less than three fields high or wide reaches the same
+        #  field from several directions, so it is counted from the table.
+        starts, neighbors = get_neighbor_table(height, width, topology)
+
+        def count(fields):
+            layout = fields.to_bytes(size, "little")
+            return int.from_bytes(
+                bytes(sum(layout[neighbor] for neighbor in
+                          neighbors[starts[index]:starts[index + 1]])
+                      for index in range(size)), "little")
+
+    return count
@@ -1,12 +1,25 @@
 from tkinter import *
 
-VERY_EASY = 1
-EASY = 10
-NORMAL = 15
-HARD = 22
+from boardcanvas import BoardCanvas
+from boardpool import BoardPool, get_start
+from presets import NORMAL, SIZES, DIFFICULTIES
+from profiler import get_profiler, TRACE_FILE
+from savefile import SAVE_FILE
+from topology import SQUARE, TORUS, HEX
+
+#  The size in the menu for a board that is generated as it is explored, and
+#  the number of rows and columns the board has.
+ENDLESS = "Endless"
+ENDLESS_SIZE = 1000000
 
 DEFAULT_SIZE = "15x15"
 DEFAULT_DIFFICULTY = "Normal"
+DEFAULT_TOPOLOGY = "Square"
+
+TOPOLOGIES = {"Square": SQUARE, "Torus": TORUS, "Hex": HEX}
+
+#  How often the profiling overlay is updated, in milliseconds.
+OVERLAY_INTERVAL = 500
 
 DEFAULT_COLOR = "#F0F0F0"
 
@@ -14,6 +27,8 @@ WIN_MESSAGE = "You won!"
 WIN_COLOR = "green"
 LOSE_MESSAGE = "Game over"
 LOSE_COLOR = "red"
+#  Shown when no no-guess board was ready for a new game.
+GUESSING_MESSAGE = "No no-guess board was ready, this game may need a guess"
 
 class UI:
     """
@@ -28,7 +43,9 @@ class UI:
 
         self.__grid_height = 15
         self.__grid_width = 15
+        self.__endless = False
         self.__difficulty_level = NORMAL
+        self.__topology_type = SQUARE
 
         #  Interface widgets
         self.__title = Label(self.__mainwindow, text="Minesweeper",
@@ -40,15 +57,26 @@ class UI:
         self.__size.set(DEFAULT_SIZE)
         self.__size_menu = OptionMenu(self.__mainwindow,
                                       self.__size,
-                                      *["10x10", "15x15", "20x20", "20x40"],
+                                      *SIZES, ENDLESS,
                                       command=self.set_size)
         self.__difficulty = StringVar()
         self.__difficulty.set(DEFAULT_DIFFICULTY)
         self.__difficulty_menu = OptionMenu(self.__mainwindow,
                                             self.__difficulty,
-                                            *["Very Easy", "Easy", "Normal",
-                                              "Hard"],
+                                            *DIFFICULTIES,
                                             command=self.set_difficulty)
+        self.__topology = StringVar()
+        self.__topology.set(DEFAULT_TOPOLOGY)
+        self.__topology_menu = OptionMenu(self.__mainwindow,
+                                          self.__topology,
+                                          *TOPOLOGIES,
+                                          command=self.set_topology)
+        self.__no_guess = BooleanVar()
+        self.__no_guess_button = Checkbutton(self.__mainwindow,
+                                             text="No guessing",
+                                             variable=self.__no_guess,
+                                             command=self.prepare_boards)
+        self.__board_pool = BoardPool()
 
         self.__check_button = Button(self.__mainwindow, text="Check",
                                      command=lambda:
@@ -58,66 +86,186 @@ class UI:
                                        self.new_game(grid_object))
         self.__exit_button = Button(self.__mainwindow, text="Exit",
                                     command=self.stop)
+        self.__file_buttons = Frame(self.__mainwindow)
+        self.__save_button = Button(self.__file_buttons, text="Save",
+                                    command=lambda:
+                                    self.save_game(grid_object))
+        self.__load_button = Button(self.__file_buttons, text="Load",
+                                    command=lambda:
+                                    self.load_game(grid_object))
+        self.__undo_button = Button(self.__file_buttons, text="Undo",
+                                    command=lambda:
+                                    self.undo(grid_object))
+        self.__redo_button = Button(self.__file_buttons, text="Redo",
+                                    command=lambda:
+                                    self.redo(grid_object))
+        self.__save_button.pack(side=LEFT)
+        self.__load_button.pack(side=LEFT)
+        self.__undo_button.pack(side=LEFT)
+        self.__redo_button.pack(side=LEFT)
+        self.__mainwindow.bind("<Control-z>",
+                               lambda event: self.undo(grid_object))
+        self.__mainwindow.bind("<Control-y>",
+                               lambda event: self.redo(grid_object))
+
+        self.__board_canvas = BoardCanvas(self.__mainwindow, grid_object)
+
+        #  The profiling overlay is only shown if profiling is on.
+        self.__overlay = None
+        self.__trace_button = None
+        if get_profiler().is_enabled():
+            self.__overlay = Label(self.__mainwindow, justify=LEFT,
+                                   anchor=W, font=("Courier", 8))
+            self.__trace_button = Button(self.__mainwindow,
+                                         text="Save trace",
+                                         command=self.save_trace)
+            self.__mainwindow.after(OVERLAY_INTERVAL, self.update_overlay)
 
     def display_widgets(self):
         """
         Displays the widgets on the interface.
         """
-        self.__size_menu.grid(row=2, column=0, columnspan=4,
-                              sticky=W)
-        self.__difficulty_menu.grid(row=2, column=4, columnspan=6, sticky=W)
-
-        self.__restart_button.grid(row=self.__grid_height+3,
-                                   column=self.__grid_width*1//3,
-                                   columnspan=self.__grid_width//3)
-        self.__exit_button.grid(row=self.__grid_height+3,
-                                column=self.__grid_width*2//3,
-                                columnspan=self.__grid_width//3)
-        self.__title.grid(row=0, column=0, columnspan=self.__grid_width,
-                          sticky=NE+SW)
-        self.__check_button.grid(row=self.__grid_height+3, column=0,
-                                 columnspan=self.__grid_width//3)
-        self.__result_label.grid(row=1, column=0,
-                                 columnspan=self.__grid_width,
+        self.__size_menu.grid(row=2, column=0, sticky=W)
+        self.__difficulty_menu.grid(row=2, column=1, sticky=W)
+        self.__topology_menu.grid(row=2, column=2, sticky=W)
+        self.__no_guess_button.grid(row=2, column=3, sticky=W)
+
+        self.__check_button.grid(row=4, column=0)
+        self.__restart_button.grid(row=4, column=1)
+        self.__exit_button.grid(row=4, column=2)
+        self.__file_buttons.grid(row=4, column=3)
+        self.__title.grid(row=0, column=0, columnspan=4, sticky=NE+SW)
+        self.__result_label.grid(row=1, column=0, columnspan=4,
                                  sticky=NE+SW)
+        if self.__overlay is not None:
+            self.__overlay.grid(row=5, column=0, columnspan=3, sticky=W)
+            self.__trace_button.grid(row=5, column=3)
+
+    def update_overlay(self):
+        """
+        Shows the latest profiling results on the overlay: the time from the
+        last user action to its redraw with the Tk calls it took, and how
+        long each recorded path takes on average and at most. Schedules
+        itself again.
+        """
+        profiler = get_profiler()
+        lines = []
+        action = profiler.get_last_action()
+        if action is not None:
+            name, _, duration, calls = action
+            lines.append(f"last {name}: {duration * 1000:.1f} ms, "
+                         f"{calls} Tk calls")
+        for name, (count, total, longest) in \
+                sorted(profiler.get_summary().items()):
+            lines.append(f"{name}: {count} x {total / count * 1000:.2f} ms, "
+                         f"max {longest * 1000:.2f} ms")
+        self.__overlay.configure(text="\n".join(lines))
+        self.__mainwindow.after(OVERLAY_INTERVAL, self.update_overlay)
+
+    def save_trace(self):
+        """
+        Exports the recorded events to a trace file.
+        """
+        get_profiler().export(TRACE_FILE)
+        self.__trace_button.configure(text=f"Saved {TRACE_FILE}")
+
+    def save_game(self, grid_object):
+        """
+        Saves the current game to the save file.
+
+        :param grid_object: GameGrid, the grid that the fields are stored in
+        """
+        try:
+            grid_object.save_game(SAVE_FILE)
+        except (OSError, ValueError) as error:
+            self.__result_label.configure(text=f"Not saved: {error}")
+            return
+        self.__result_label.configure(text=f"Saved {SAVE_FILE}")
+
+    def load_game(self, grid_object):
+        """
+        Continues the game saved in the save file.
+
+        :param grid_object: GameGrid, the grid that the fields are stored in
+        """
+        get_profiler().start_action("load game")
+        try:
+            grid_object.load_game(self, SAVE_FILE)
+        except (OSError, ValueError) as error:
+            self.__result_label.configure(text=f"Not loaded: {error}")
+            return
+        self.reset_result()
+        self.display_grid(grid_object)
+        self.get_mainwindow().geometry("")
+        if grid_object.get_result() is not None:
+            self.display_result(grid_object.get_result())
+
+    def undo(self, grid_object):
+        """
+        Takes back the latest move. A game that was over is played on.
+
+        :param grid_object: GameGrid, the grid that the fields are stored in
+        """
+        get_profiler().start_action("undo")
+        grid_object.undo()
+        self.update_result(grid_object)
+
+    def redo(self, grid_object):
+        """
+        Makes the latest undone move again.
+
+        :param grid_object: GameGrid, the grid that the fields are stored in
+        """
+        get_profiler().start_action("redo")
+        grid_object.redo()
+        self.update_result(grid_object)
+
+    def update_result(self, grid_object):
+        """
+        Displays the result of the game, or nothing if the game is still on.
+
+        :param grid_object: GameGrid, the grid that the fields are stored in
+        """
+        if grid_object.get_result() is None:
+            self.reset_result()
+        else:
+            self.display_result(grid_object.get_result())
 
     def display_grid(self, grid_object):
         """
-        Displays the fields in a grid.
+        Displays the fields of the grid on the board canvas.
 
         :param grid_object: GameGrid, the grid that the fields are stored in
         """
-        #  Set the minimum size of the fields.
         self.__mainwindow.rowconfigure(0, minsize=40)
+        self.__board_canvas.set_board(grid_object.get_board())
+        self.__board_canvas.get_frame().grid(row=3, column=0, columnspan=4)
 
-        for row in range(3, self.__grid_height + 3):
-            self.__mainwindow.rowconfigure(row, minsize=21)
-        for col in range(self.__grid_width):
-            self.__mainwindow.columnconfigure(col, minsize=21)
-
-        game_grid = grid_object.get_grid()
+    def draw_fields(self, indices):
+        """
+        Redraws the fields that have changed. The fields are drawn in one
+        batch once the window is idle.
 
-        for row in range(self.__grid_height):
-            for col in range(self.__grid_width):
-                field = game_grid[row][col]
-                field.get_button().grid(row=row + 3, column=col,
-                                        sticky=NE + SW)
-                field.get_button().bind("<Button-2>",
-                                        game_grid[row][col].flag)
-                field.get_button().bind("<Button-3>",
-                                        game_grid[row][col].flag)
+        :param indices: list, the indices of the changed fields
+        """
+        self.__board_canvas.draw_fields(indices)
 
     def set_size(self, size):
         """
         Sets the height and width of the game grid based on the selection in
         the menu.
 
-        :param size:
+        :param size: str, the size as "HEIGHTxWIDTH", or ENDLESS
         """
-        size = self.__size.get()
-        height, width = size.split("x")
+        self.__size.set(size)
+        self.__endless = size == ENDLESS
+        if self.__endless:
+            height = width = ENDLESS_SIZE
+        else:
+            height, width = size.split("x")
         self.__grid_height = int(height)
         self.__grid_width = int(width)
+        self.prepare_boards()
 
     def set_difficulty(self, difficulty):
         """
@@ -126,15 +274,28 @@ class UI:
 
         :param difficulty:
         """
-        difficulty = self.__difficulty.get()
-        if difficulty == "Very Easy":
-            self.__difficulty_level = VERY_EASY
-        if difficulty == "Easy":
-            self.__difficulty_level = EASY
-        if difficulty == "Normal":
-            self.__difficulty_level = NORMAL
-        if difficulty == "Hard":
-            self.__difficulty_level = HARD
+        self.__difficulty_level = DIFFICULTIES[self.__difficulty.get()]
+        self.prepare_boards()
+
+    def set_topology(self, topology):
+        """
+        Sets the shape of the game board based on the selection in the menu.
+
+        :param topology:
+        """
+        self.__topology_type = TOPOLOGIES[self.__topology.get()]
+        self.prepare_boards()
+
+    def prepare_boards(self):
+        """
+        Starts looking for no-guess boards of the chosen size, difficulty and
+        shape in the background, if no guessing is chosen, so that they are
+        ready by the time a new game is started. Endless boards can't be
+        checked for guessing, so none are looked for.
+        """
+        if self.__no_guess.get() and not self.__endless:
+            self.__board_pool.fill(*self.get_size(), self.get_difficulty(),
+                                   self.get_topology())
 
     def display_result(self, win):
         """
@@ -148,7 +309,6 @@ class UI:
         else:
             self.__result_label.configure(text=LOSE_MESSAGE,
                                           background=LOSE_COLOR)
-        self.__mainwindow.mainloop()
 
     def game_over(self, win, grid_object):
         """
@@ -174,58 +334,69 @@ class UI:
         :param grid_object: GameGrid, the grid that the fields are stored in
         :return:
         """
-        game_grid = grid_object.get_grid()
-
-        flagged = []
-        has_mine = []
-
-        #  Find all flagged fields.
-        for row in range(len(game_grid)):
-            for col in range(len(game_grid[row])):
-                if game_grid[row][col].is_flagged():
-                    flagged.append(str(row) + ' ' + str(col))
-
-        #  Find all mines.
-        for row in range(len(game_grid)):
-            for col in range(len(game_grid[row])):
-                if game_grid[row][col].get_mines() == 9:
-                    has_mine.append(str(row) + ' ' + str(col))
-
-        #  Check if all flagged fields and fields with mines are the same fields.
-        for i in range(len(has_mine)):
-            try:
-                if flagged[i] == has_mine[i]:
-                    pass
-                else:
-                    self.game_over(False, grid_object)
-                    return
-            except IndexError:
-                self.game_over(False, grid_object)
-                return
-
-        self.game_over(True, grid_object)
+        get_profiler().start_action("check")
+        grid_object.check()
 
 
     def new_game(self, grid_object):
         """
         Resets the game grid and starts a new game with the chosen size and
-        difficulty.
+        difficulty. The new game is played in the event loop that is already
+        running, so restarting doesn't grow the stack.
 
         :param ui: UI, the user interface of the game
         :param grid_object: GameGrid, the grid that the fields are stored in
         """
+        get_profiler().start_action("new game")
+
         #  Reset the game and the result.
         grid_object.reset()
         self.reset_result()
 
-        #  Create new game.
+        #  Create new game. A no-guess board is taken from the boards found
+        #  in the background and started by opening its start field. If none
+        #  is ready, an ordinary board is played instead right away, rather
+        #  than keeping the window waiting for the workers, and the player is
+        #  told that it may need guessing. An endless board
+        #  is always square and its first opened field is always safe.
         grid_height, grid_width = self.get_size()
-        grid_object.generate_fields(grid_height, grid_width, self.get_difficulty(),
-                                    self)
+        seed = None
+        if self.__endless:
+            grid_object.generate_fields(grid_height, grid_width,
+                                        self.get_difficulty(), self,
+                                        first_click_safe=True, endless=True)
+        else:
+            if self.__no_guess.get():
+                seed = self.__board_pool.get_seed(
+                    grid_height, grid_width, self.get_difficulty(),
+                    self.get_topology(), timeout=0)
+            grid_object.generate_fields(grid_height, grid_width,
+                                        self.get_difficulty(), self, seed,
+                                        seed is not None,
+                                        self.get_topology())
+            if self.__no_guess.get() and seed is None:
+                self.__result_label.configure(text=GUESSING_MESSAGE)
         self.display_grid(grid_object)
         self.display_widgets()
-        self.get_mainwindow().geometry(f"{grid_width*21}x{grid_height*21+118}")
-        self.get_mainwindow().mainloop()
+        self.get_mainwindow().geometry("")
+        if seed is not None:
+            grid_object.open_on_press(*get_start(grid_height, grid_width))
+
+    def show(self):
+        """
+        Displays the widgets and paints the window before the first board is
+        built, so that the window appears right away even if the board takes
+        a while to generate.
+        """
+        self.display_widgets()
+        self.__mainwindow.update()
+
+    def start(self):
+        """
+        Runs the event loop of the program until the window is closed. This is
+        the only event loop; games are started and ended within it.
+        """
+        self.__mainwindow.mainloop()
 
     def reset_result(self):
         """
@@ -237,6 +408,7 @@ class UI:
         """
         Ends the execution of the program.
         """
+        self.__board_pool.shutdown()
         self.__mainwindow.destroy()
 
     def get_mainwindow(self):
@@ -251,6 +423,12 @@ class UI:
         """
         return self.__difficulty_level
 
+    def get_topology(self):
+        """
+        :return: str, the shape of the board
+        """
+        return self.__topology_type
+
     def get_size(self):
         """
         :return: int, the size